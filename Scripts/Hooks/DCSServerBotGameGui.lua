@@ -4,5 +4,6 @@
 -- some ideas or even took / amended some of their code.
 ---------------------------------------------------------
 dofile(lfs.writedir() .. 'Scripts/net/DCSServerBot/DCSServerBotConfig.lua')
+dofile(lfs.writedir() .. 'Scripts/net/DCSServerBot/DCSServerBotMsgPack.lua')
 dofile(lfs.writedir() .. 'Scripts/net/DCSServerBot/DCSServerBotUtils.lua')
 dofile(lfs.writedir() .. 'Scripts/net/DCSServerBot/DCSServerBotMain.lua')
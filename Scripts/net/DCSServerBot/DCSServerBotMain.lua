@@ -9,6 +9,7 @@ local loadfile	= base.loadfile
 local lfs		= require('lfs')
 local config	= require("DCSServerBotConfig")
 local JSON 		= loadfile("Scripts\\JSON.lua")()
+local msgpack	= require("DCSServerBotMsgPack")
 
 package.path  = package.path..";.\\LuaSocket\\?.lua;"
 package.cpath = package.cpath..";.\\LuaSocket\\?.dll;"
@@ -30,7 +31,12 @@ local function createSimulationFrameHandler()
         repeat
             msg, err = UDPRecvSocket:receive()
             if not err then
-                local decoded = JSON:decode(msg)
+                local decoded
+                if msgpack.isFrame(msg) then
+                    decoded = msgpack.decodeFrame(msg)
+                else
+                    decoded = JSON:decode(msg)
+                end
                 local commandFunc = dcsbot[decoded.command]
                 if commandFunc then
                     commandFunc(decoded)
@@ -0,0 +1,371 @@
+-- DCSServerBotMsgPack.lua
+-----------------------------------------------------
+-- Minimal MessagePack encoder / decoder, used as a
+-- compact alternative to JSON for the communication
+-- between the DCS hooks and DCSServerBot.
+-----------------------------------------------------
+local base 		= _G
+
+module('DCSServerBotMsgPack')
+
+local type		= base.type
+local pairs		= base.pairs
+local tostring	= base.tostring
+local error		= base.error
+local string	= base.string
+local table		= base.table
+local math		= base.math
+
+local char		= string.char
+local byte		= string.byte
+local sub		= string.sub
+local concat	= table.concat
+local floor		= math.floor
+local frexp		= math.frexp
+local ldexp		= math.ldexp
+local huge		= math.huge
+
+-- Wire format version, has to match the one of DCSServerBot (services/servicebus/codec.py)
+VERSION = 1
+-- Frame header: marker, version, type
+MARKER = 0
+TYPE_MSGPACK = 1
+TYPE_FRAGMENT = 2
+-- max payload per UDP packet, larger messages are sent in fragments
+MAX_CHUNK_SIZE = 60000
+
+local fragment_id = 0
+
+local function uint(n, size)
+	local t = {}
+	for i = size, 1, -1 do
+		t[i] = char(n % 256)
+		n = floor(n / 256)
+	end
+	return concat(t)
+end
+
+local function encode_double(n)
+	local sign = 0
+	if n ~= n then
+		return char(0xcb, 0x7f, 0xf8, 0, 0, 0, 0, 0, 0)
+	end
+	if n < 0 or (n == 0 and 1 / n < 0) then
+		sign = 0x80
+		n = -n
+	end
+	if n == huge then
+		return char(0xcb, sign + 0x7f, 0xf0, 0, 0, 0, 0, 0, 0)
+	elseif n == 0 then
+		return char(0xcb, sign, 0, 0, 0, 0, 0, 0, 0)
+	end
+	local mant, exp = frexp(n)
+	local e = exp + 1022
+	local f
+	if e <= 0 then
+		-- subnormal number
+		f = ldexp(n, 1074)
+		e = 0
+	else
+		f = ldexp(mant * 2 - 1, 52)
+	end
+	local hi = floor(f / 4294967296)
+	local lo = f % 4294967296
+	return char(0xcb, sign + floor(e / 16), (e % 16) * 16 + floor(hi / 65536), floor(hi / 256) % 256, hi % 256) .. uint(lo, 4)
+end
+
+local function encode_integer(n)
+	if n >= 0 then
+		if n < 128 then
+			return char(n)
+		elseif n < 256 then
+			return char(0xcc, n)
+		elseif n < 65536 then
+			return char(0xcd) .. uint(n, 2)
+		elseif n < 4294967296 then
+			return char(0xce) .. uint(n, 4)
+		end
+		return char(0xcf) .. uint(n, 8)
+	end
+	if n >= -32 then
+		return char(256 + n)
+	elseif n >= -128 then
+		return char(0xd0, 256 + n)
+	elseif n >= -32768 then
+		return char(0xd1) .. uint(65536 + n, 2)
+	elseif n >= -2147483648 then
+		return char(0xd2) .. uint(4294967296 + n, 4)
+	end
+	-- larger negative numbers can't be represented exactly, send them as double
+	return encode_double(n)
+end
+
+local encode_value
+
+local function is_array(tbl)
+	local count = 0
+	for k, _ in pairs(tbl) do
+		if type(k) ~= 'number' or k < 1 or floor(k) ~= k then
+			return false, 0
+		end
+		count = count + 1
+	end
+	for i = 1, count do
+		if tbl[i] == nil then
+			return false, 0
+		end
+	end
+	return true, count
+end
+
+local function encode_table(tbl, buffer)
+	local array, count = is_array(tbl)
+	if array then
+		if count < 16 then
+			buffer[#buffer + 1] = char(0x90 + count)
+		elseif count < 65536 then
+			buffer[#buffer + 1] = char(0xdc) .. uint(count, 2)
+		else
+			buffer[#buffer + 1] = char(0xdd) .. uint(count, 4)
+		end
+		for i = 1, count do
+			encode_value(tbl[i], buffer)
+		end
+		return
+	end
+	-- like JSON, maps only have string keys
+	count = 0
+	for k, v in pairs(tbl) do
+		if type(v) ~= 'function' and type(v) ~= 'userdata' then
+			count = count + 1
+		end
+	end
+	if count < 16 then
+		buffer[#buffer + 1] = char(0x80 + count)
+	elseif count < 65536 then
+		buffer[#buffer + 1] = char(0xde) .. uint(count, 2)
+	else
+		buffer[#buffer + 1] = char(0xdf) .. uint(count, 4)
+	end
+	for k, v in pairs(tbl) do
+		if type(v) ~= 'function' and type(v) ~= 'userdata' then
+			encode_value(tostring(k), buffer)
+			encode_value(v, buffer)
+		end
+	end
+end
+
+encode_value = function(value, buffer)
+	local t = type(value)
+	if t == 'nil' then
+		buffer[#buffer + 1] = char(0xc0)
+	elseif t == 'boolean' then
+		buffer[#buffer + 1] = char(value and 0xc3 or 0xc2)
+	elseif t == 'number' then
+		if floor(value) == value and value >= -9007199254740992 and value <= 9007199254740992 then
+			buffer[#buffer + 1] = encode_integer(value)
+		else
+			buffer[#buffer + 1] = encode_double(value)
+		end
+	elseif t == 'string' then
+		local len = #value
+		if len < 32 then
+			buffer[#buffer + 1] = char(0xa0 + len)
+		elseif len < 256 then
+			buffer[#buffer + 1] = char(0xd9, len)
+		elseif len < 65536 then
+			buffer[#buffer + 1] = char(0xda) .. uint(len, 2)
+		else
+			buffer[#buffer + 1] = char(0xdb) .. uint(len, 4)
+		end
+		buffer[#buffer + 1] = value
+	elseif t == 'table' then
+		encode_table(value, buffer)
+	else
+		buffer[#buffer + 1] = char(0xc0)
+	end
+end
+
+function encode(value)
+	local buffer = {}
+	encode_value(value, buffer)
+	return concat(buffer)
+end
+
+local function read_uint(data, pos, size)
+	local n = 0
+	for i = pos, pos + size - 1 do
+		n = n * 256 + byte(data, i)
+	end
+	return n
+end
+
+local function read_int(data, pos, size)
+	if byte(data, pos) < 128 then
+		return read_uint(data, pos, size)
+	end
+	-- two's complement, calculated bytewise to not lose precision on 64bit values
+	local n = 0
+	for i = pos, pos + size - 1 do
+		n = n * 256 + (255 - byte(data, i))
+	end
+	return -(n + 1)
+end
+
+local function read_double(data, pos)
+	local b1, b2 = byte(data, pos, pos + 1)
+	local sign = b1 >= 128 and -1 or 1
+	local e = (b1 % 128) * 16 + floor(b2 / 16)
+	local f = (b2 % 16) * 281474976710656 + read_uint(data, pos + 2, 6)
+	if e == 2047 then
+		if f == 0 then
+			return sign * huge
+		end
+		return 0 / 0
+	elseif e == 0 then
+		return sign * ldexp(f, -1074)
+	end
+	return sign * ldexp(1 + f / 4503599627370496, e - 1023)
+end
+
+local function read_float(data, pos)
+	local b1, b2 = byte(data, pos, pos + 1)
+	local sign = b1 >= 128 and -1 or 1
+	local e = (b1 % 128) * 2 + floor(b2 / 128)
+	local f = (b2 % 128) * 65536 + read_uint(data, pos + 2, 2)
+	if e == 255 then
+		if f == 0 then
+			return sign * huge
+		end
+		return 0 / 0
+	elseif e == 0 then
+		return sign * ldexp(f, -149)
+	end
+	return sign * ldexp(1 + f / 8388608, e - 127)
+end
+
+local decode_value
+
+local function decode_array(data, pos, count)
+	local tbl = {}
+	local value
+	for i = 1, count do
+		value, pos = decode_value(data, pos)
+		tbl[i] = value
+	end
+	return tbl, pos
+end
+
+local function decode_map(data, pos, count)
+	local tbl = {}
+	local key, value
+	for _ = 1, count do
+		key, pos = decode_value(data, pos)
+		value, pos = decode_value(data, pos)
+		if key ~= nil then
+			tbl[key] = value
+		end
+	end
+	return tbl, pos
+end
+
+decode_value = function(data, pos)
+	local b = byte(data, pos)
+	if b == nil then
+		error('MessagePack: unexpected end of data')
+	end
+	pos = pos + 1
+	if b < 0x80 then
+		return b, pos
+	elseif b < 0x90 then
+		return decode_map(data, pos, b - 0x80)
+	elseif b < 0xa0 then
+		return decode_array(data, pos, b - 0x90)
+	elseif b < 0xc0 then
+		local len = b - 0xa0
+		return sub(data, pos, pos + len - 1), pos + len
+	elseif b >= 0xe0 then
+		return b - 256, pos
+	elseif b == 0xc0 then
+		return nil, pos
+	elseif b == 0xc2 then
+		return false, pos
+	elseif b == 0xc3 then
+		return true, pos
+	elseif b == 0xc4 or b == 0xd9 then
+		local len = byte(data, pos)
+		return sub(data, pos + 1, pos + len), pos + 1 + len
+	elseif b == 0xc5 or b == 0xda then
+		local len = read_uint(data, pos, 2)
+		return sub(data, pos + 2, pos + 1 + len), pos + 2 + len
+	elseif b == 0xc6 or b == 0xdb then
+		local len = read_uint(data, pos, 4)
+		return sub(data, pos + 4, pos + 3 + len), pos + 4 + len
+	elseif b == 0xca then
+		return read_float(data, pos), pos + 4
+	elseif b == 0xcb then
+		return read_double(data, pos), pos + 8
+	elseif b == 0xcc then
+		return read_uint(data, pos, 1), pos + 1
+	elseif b == 0xcd then
+		return read_uint(data, pos, 2), pos + 2
+	elseif b == 0xce then
+		return read_uint(data, pos, 4), pos + 4
+	elseif b == 0xcf then
+		return read_uint(data, pos, 8), pos + 8
+	elseif b == 0xd0 then
+		return read_int(data, pos, 1), pos + 1
+	elseif b == 0xd1 then
+		return read_int(data, pos, 2), pos + 2
+	elseif b == 0xd2 then
+		return read_int(data, pos, 4), pos + 4
+	elseif b == 0xd3 then
+		return read_int(data, pos, 8), pos + 8
+	elseif b == 0xdc then
+		return decode_array(data, pos + 2, read_uint(data, pos, 2))
+	elseif b == 0xdd then
+		return decode_array(data, pos + 4, read_uint(data, pos, 4))
+	elseif b == 0xde then
+		return decode_map(data, pos + 2, read_uint(data, pos, 2))
+	elseif b == 0xdf then
+		return decode_map(data, pos + 4, read_uint(data, pos, 4))
+	end
+	error('MessagePack: unsupported type 0x' .. string.format('%02x', b))
+end
+
+function decode(data)
+	local value, _ = decode_value(data, 1)
+	return value
+end
+
+-- returns true, if the given message is a binary frame and no JSON
+function isFrame(msg)
+	return byte(msg, 1) == MARKER
+end
+
+function encodeFrame(tbl)
+	return char(MARKER, VERSION, TYPE_MSGPACK) .. encode(tbl)
+end
+
+function decodeFrame(msg)
+	local version, frame_type = byte(msg, 2, 3)
+	if version ~= VERSION or frame_type ~= TYPE_MSGPACK then
+		error('MessagePack: unsupported frame (version ' .. tostring(version) .. ', type ' .. tostring(frame_type) .. ')')
+	end
+	return decode(sub(msg, 4))
+end
+
+-- splits a message (JSON or frame) into fragments, if it does not fit into one UDP packet
+function split(msg)
+	if #msg <= MAX_CHUNK_SIZE then
+		return { msg }
+	end
+	fragment_id = (fragment_id + 1) % 4294967296
+	local total = math.ceil(#msg / MAX_CHUNK_SIZE)
+	local fragments = {}
+	for i = 0, total - 1 do
+		fragments[i + 1] = char(MARKER, VERSION, TYPE_FRAGMENT) .. uint(fragment_id, 4) .. uint(i, 2) .. uint(total, 2) ..
+				sub(msg, i * MAX_CHUNK_SIZE + 1, (i + 1) * MAX_CHUNK_SIZE)
+	end
+	return fragments
+end
@@ -6,6 +6,7 @@ local loadfile 		= base.loadfile
 local net			= base.net
 local package		= base.package
 local pairs			= base.pairs
+local ipairs		= base.ipairs
 local require		= base.require
 local string 		= base.string
 local table         = base.table
@@ -20,6 +21,7 @@ local TableUtils 	= require('TableUtils')
 local Tools     	= require('tools')
 local U 			= require('me_utilities')
 local config		= require('DCSServerBotConfig')
+local msgpack		= require('DCSServerBotMsgPack')
 
 local JSON = loadfile(lfs.currentdir() .. "Scripts\\JSON.lua")()
 
@@ -37,8 +39,15 @@ function sendBotTable(tbl, channel)
 	end
 	tbl.server_name = server_name
 	tbl.channel = channel or "-1"
-	local tbl_json_txt = JSON:encode(tbl)
-	socket.try(UDPSendSocket:sendto(tbl_json_txt, config.BOT_HOST, config.BOT_PORT))
+	local msg
+	if config.WIRE_FORMAT == 'msgpack' then
+		msg = msgpack.encodeFrame(tbl)
+	else
+		msg = JSON:encode(tbl)
+	end
+	for _, fragment in ipairs(msgpack.split(msg)) do
+		socket.try(UDPSendSocket:sendto(fragment, config.BOT_HOST, config.BOT_PORT))
+	end
 end
 
 function loadSettingsRaw()
@@ -108,6 +108,7 @@ class NodeImpl(Node):
             self.plugins.append('cloud')
         self.db_version = None
         self.pool: Optional[ConnectionPool] = None
+        self.blocking_detector: Optional[utils.BlockingCallDetector] = None
         self.apool: Optional[AsyncConnectionPool] = None
         self._master = None
         self.listen_address = self.locals.get('listen_address', '0.0.0.0')
@@ -121,6 +122,8 @@ class NodeImpl(Node):
 
     async def post_init(self):
         self.pool, self.apool = await self.init_db()
+        if self.pool.limits or self.apool.limits:
+            self.adapt_pools.start()
         try:
             async with self.apool.connection() as conn:
                 async with conn.transaction():
@@ -269,7 +272,7 @@ class NodeImpl(Node):
         log3.addHandler(fh)
         return log
 
-    async def init_db(self) -> tuple[ConnectionPool, AsyncConnectionPool]:
+    async def init_db(self) -> tuple[utils.MonitoredConnectionPool, utils.MonitoredAsyncConnectionPool]:
         url = self.config.get("database", self.locals.get('database'))['url']
         try:
             url = url.replace('SECRET', quote(utils.get_password('database')) or '')
@@ -289,17 +292,36 @@ class NodeImpl(Node):
                     raise
                 self.log.warning("- Database not available, trying again in 5s ...")
                 await asyncio.sleep(5)
-        pool_min = self.config.get("database", self.locals.get('database')).get('pool_min', 4)
-        pool_max = self.config.get("database", self.locals.get('database')).get('pool_max', 10)
-        max_idle = self.config.get("database", self.locals.get('database')).get('max_idle', 10 * 60.0)
+        db_config = self.config.get("database", self.locals.get('database'))
+        pool_min = db_config.get('pool_min', 4)
+        pool_max = db_config.get('pool_max', 10)
+        sync_pool_min = db_config.get('sync_pool_min', 2)
+        sync_pool_max = db_config.get('sync_pool_max', 4)
+        max_idle = db_config.get('max_idle', 10 * 60.0)
         timeout = 60.0 if self.locals.get('slow_system', False) else 30.0
-        db_pool = ConnectionPool(url, min_size=2, max_size=4,
-                                 check=ConnectionPool.check_connection, max_idle=max_idle, timeout=timeout)
-        db_apool = AsyncConnectionPool(conninfo=url, min_size=pool_min, max_size=pool_max,
-                                       check=AsyncConnectionPool.check_connection, max_idle=max_idle, timeout=timeout)
+        if db_config.get('detect_blocking', False):
+            # debug mode: find synchronous database calls that block the event loop
+            self.blocking_detector = utils.BlockingCallDetector(self.log, db_config.get('blocking_threshold', 50))
+        # hot statements are prepared on the server, unless a pooler in between does not support that
+        utils.PreparedStatements.enabled = db_config.get('prepared_statements', True)
+        # adaptive pools start with their max size and shrink down to their min size, if the connections are not needed
+        adaptive = db_config.get('adaptive_pool', False)
+        db_pool = utils.MonitoredConnectionPool(url, min_size=sync_pool_min, max_size=sync_pool_max,
+                                                check=ConnectionPool.check_connection, max_idle=max_idle,
+                                                timeout=timeout, monitor=utils.PoolMonitor('pool'),
+                                                detector=self.blocking_detector,
+                                                limits=(sync_pool_min, sync_pool_max) if adaptive else None)
+        db_apool = utils.MonitoredAsyncConnectionPool(conninfo=url, min_size=pool_min, max_size=pool_max,
+                                                      check=AsyncConnectionPool.check_connection, max_idle=max_idle,
+                                                      timeout=timeout, monitor=utils.PoolMonitor('apool'),
+                                                      limits=(pool_min, pool_max) if adaptive else None)
         return db_pool, db_apool
 
     def close_db(self):
+        if self.adapt_pools.is_running():
+            self.adapt_pools.cancel()
+        if self.blocking_detector:
+            self.blocking_detector.report()
         if self.pool:
             try:
                 self.pool.close()
@@ -312,6 +334,10 @@ class NodeImpl(Node):
                 self.log.exception(ex)
 
     async def aclose_db(self):
+        if self.adapt_pools.is_running():
+            self.adapt_pools.cancel()
+        if self.blocking_detector:
+            self.blocking_detector.report()
         if self.pool:
             try:
                 self.pool.close()
@@ -684,6 +710,8 @@ class NodeImpl(Node):
                                                 "object": "Node",
                                                 "method": "upgrade"
                                             }
+                                            # one message per node, the agents still run the old version that
+                                            # does not know shared messages (see PubSub.publish_all())
                                             await conn.execute("""
                                                 INSERT INTO intercom (guild_id, node, data) VALUES (%s, %s, %s)
                                             """, (self.guild_id, node, Json(data)))
@@ -841,6 +869,28 @@ class NodeImpl(Node):
         if server.is_remote:
             server.name = new_name
 
+    def get_pool_stats(self) -> dict[str, dict]:
+        """
+        Returns the wait and checkout times (in ms), saturation events and peak usage of both database pools since
+        the last call.
+        """
+        return {
+            "pool": self.pool.monitor.stats() | {"max_size": self.pool.max_size},
+            "apool": self.apool.monitor.stats() | {"max_size": self.apool.max_size}
+        }
+
+    @tasks.loop(seconds=10.0)
+    async def adapt_pools(self):
+        try:
+            size = self.pool.adapt()
+            if size:
+                self.log.info(f"Synchronous database pool resized to {size} connections.")
+            size = await self.apool.adapt()
+            if size:
+                self.log.info(f"Database pool resized to {size} connections.")
+        except Exception as ex:
+            self.log.exception(ex)
+
     @tasks.loop(minutes=5.0)
     async def autoupdate(self):
         from services import BotService, ServiceBus
@@ -1,10 +1,8 @@
 from __future__ import annotations
 
 import asyncio
-import json
 import os
 import shutil
-import socket
 import subprocess
 import sys
 import traceback
@@ -87,6 +85,7 @@ class ServerImpl(Server):
     bot: Optional[DCSServerBot] = field(compare=False, init=False)
     event_handler: MissionFileSystemEventHandler = field(compare=False, default=None)
     observer: Observer = field(compare=False, default=None)
+    wire_format: str = field(compare=False, default='json')
 
     def __post_init__(self):
         super().__post_init__()
@@ -214,7 +213,7 @@ class ServerImpl(Server):
                 with open(os.path.join(bot_home, 'DCSServerBotConfig.lua'), mode='w', encoding='utf-8') as outfile:
                     for line in template.readlines():
                         line = utils.format_string(line, node=self.node, instance=self.instance, server=self,
-                                                   admin_channel=admin_channel)
+                                                   admin_channel=admin_channel, wire_format=self.bus.wire_format)
                         outfile.write(line)
         except KeyError as k:
             self.log.error(
@@ -275,7 +274,7 @@ class ServerImpl(Server):
             miz = await asyncio.to_thread(MizFile, self.node, filename)
             return miz.theatre
 
-    def serialize(self, message: dict):
+    def serialize(self, message: dict) -> dict:
         def _serialize_value(value: Any) -> Any:
             if isinstance(value, bool):
                 return value
@@ -289,18 +288,12 @@ class ServerImpl(Server):
                 return [_serialize_value(x) for x in value]
             return value
 
-        for key, value in message.items():
-            message[key] = _serialize_value(value)
-        return message
+        # build a new message instead of changing the (maybe shared) original one
+        return {key: _serialize_value(value) for key, value in message.items()}
 
     def send_to_dcs(self, message: dict):
         # As Lua does not support large numbers, convert them to strings
-        message = self.serialize(deepcopy(message))
-        msg = json.dumps(message)
-        self.log.debug(f"HOST->{self.name}: {msg}")
-        dcs_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        dcs_socket.sendto(msg.encode('utf-8'), ('127.0.0.1', int(self.port)))
-        dcs_socket.close()
+        self.bus.udp_sender.send(self, self.serialize(message))
 
     async def rename(self, new_name: str, update_settings: bool = False) -> None:
         def update_config(old_name, new_name: str, update_settings: bool = False):
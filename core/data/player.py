@@ -1,6 +1,5 @@
 from __future__ import annotations
 import discord
-from contextlib import closing
 from core import utils
 from core.data.dataobject import DataObject, DataObjectFactory
 from core.data.const import Side, Coalition
@@ -11,10 +10,16 @@ from core.services.registry import ServiceRegistry
 
 if TYPE_CHECKING:
     from .server import Server
-    from services import DCSServerBot
+    from services import DCSServerBot, ServiceBus
 
 __all__ = ["Player"]
 
+utils.PreparedStatements.register('players.upsert', """
+    INSERT INTO players (ucid, discord_id, name, last_seen) 
+    VALUES (%s, -1, %s, (now() AT TIME ZONE 'utc')) 
+    ON CONFLICT (ucid) DO UPDATE SET name=excluded.name, last_seen=excluded.last_seen
+""")
+
 
 @dataclass
 @DataObjectFactory.register()
@@ -42,47 +47,53 @@ class Player(DataObject):
     srs: bool = field(compare=False, default=False)
     radios: list[int] = field(compare=False, default_factory=list)
     bot: DCSServerBot = field(compare=False, init=False)
+    bus: ServiceBus = field(compare=False, init=False)
 
     def __post_init__(self):
-        from services import BotService
+        from services import BotService, ServiceBus
 
         super().__post_init__()
         self.bot = ServiceRegistry.get(BotService).bot
+        self.bus = ServiceRegistry.get(ServiceBus)
         if self.id == 1:
             self.active = False
+
+    async def load(self) -> None:
+        """
+        Loads the player from the database (and creates it, if it is new).
+        Has to be awaited before the player is used.
+        """
+        if self.id == 1:
             return
-        with self.pool.connection() as conn:
-            with conn.transaction():
-                with closing(conn.cursor()) as cursor:
-                    cursor.execute("""
-                        SELECT p.discord_id, CASE WHEN b.ucid IS NOT NULL THEN TRUE ELSE FALSE END AS banned, 
-                               p.manual, c.coalition, p.watchlist, p.vip 
-                        FROM players p LEFT OUTER JOIN bans b ON p.ucid = b.ucid 
-                        LEFT OUTER JOIN coalitions c ON p.ucid = c.player_ucid 
-                        WHERE p.ucid = %s 
-                        AND COALESCE(b.banned_until, (now() AT TIME ZONE 'utc')) >= (now() AT TIME ZONE 'utc')
-                    """, (self.ucid, ))
-                    # existing member found?
-                    if cursor.rowcount == 1:
-                        row = cursor.fetchone()
-                        if row[0] != -1:
-                            self._member = self.bot.guilds[0].get_member(row[0])
-                            self._verified = row[2]
-                        self.banned = row[1]
-                        if row[3]:
-                            self.coalition = Coalition(row[3])
-                        self._watchlist = row[4]
-                        self._vip = row[5]
-                    cursor.execute("""
-                        INSERT INTO players (ucid, discord_id, name, last_seen) 
-                        VALUES (%s, -1, %s, (now() AT TIME ZONE 'utc')) 
-                        ON CONFLICT (ucid) DO UPDATE SET name=excluded.name, last_seen=excluded.last_seen
-                        """, (self.ucid, self.name))
-        # if automatch is enabled, try to match the user
-        if not self.member and self.bot.locals.get('automatch', True):
-            discord_user = self.bot.match_user({"ucid": self.ucid, "name": self.name})
-            if discord_user:
-                self.member = discord_user
+        async with self.apool.connection() as conn:
+            async with conn.transaction():
+                cursor = await conn.execute("""
+                    SELECT p.discord_id, CASE WHEN b.ucid IS NOT NULL THEN TRUE ELSE FALSE END AS banned, 
+                           p.manual, c.coalition, p.watchlist, p.vip 
+                    FROM players p LEFT OUTER JOIN bans b ON p.ucid = b.ucid 
+                    LEFT OUTER JOIN coalitions c ON p.ucid = c.player_ucid 
+                    WHERE p.ucid = %s 
+                    AND COALESCE(b.banned_until, (now() AT TIME ZONE 'utc')) >= (now() AT TIME ZONE 'utc')
+                """, (self.ucid, ))
+                # existing member found?
+                if cursor.rowcount == 1:
+                    row = await cursor.fetchone()
+                    if row[0] != -1:
+                        self._member = self.bot.guilds[0].get_member(row[0])
+                        self._verified = row[2]
+                    self.banned = row[1]
+                    if row[3]:
+                        self.coalition = Coalition(row[3])
+                    self._watchlist = row[4]
+                    self._vip = row[5]
+                await utils.PreparedStatements.aexecute(conn, 'players.upsert', (self.ucid, self.name))
+                # if automatch is enabled, try to match the user (the link in the database was checked above already)
+                if not self.member and self.bot.locals.get('automatch', True):
+                    discord_user = self.bot.match_user({"ucid": self.ucid, "name": self.name}, rematch=True)
+                    if discord_user:
+                        await conn.execute('UPDATE players SET discord_id = %s WHERE ucid = %s',
+                                           (discord_user.id, self.ucid))
+                        self._member = discord_user
 
     def is_active(self) -> bool:
         return self.active
@@ -171,44 +182,39 @@ class Player(DataObject):
     def display_name(self) -> str:
         return utils.escape_string(self.name)
 
-    def update(self, data: dict):
-        with self.pool.connection() as conn:
-            with conn.transaction():
-                if 'id' in data:
-                    # if the ID has changed (due to reconnect), we need to update the server list
-                    if self.id != data['id']:
-                        del self.server.players[self.id]
-                        self.server.players[data['id']] = self
-                        self.id = data['id']
-                if 'active' in data:
-                    self.active = data['active']
-                if 'name' in data and self.name != data['name']:
-                    self.name = data['name']
-                    conn.execute('UPDATE players SET name = %s WHERE ucid = %s', (self.name, self.ucid))
-                if 'side' in data:
-                    self.side = Side(data['side'])
-                if 'slot' in data:
-                    self.slot = int(data['slot'])
-                if 'sub_slot' in data:
-                    self.sub_slot = data['sub_slot']
-                if 'unit_callsign' in data:
-                    self.unit_callsign = data['unit_callsign']
-                if 'unit_id' in data:
-                    self.unit_id = data['unit_id']
-                if 'unit_name' in data:
-                    self.unit_name = data['unit_name']
-                if 'unit_type' in data:
-                    self.unit_type = data['unit_type']
-                if 'group_name' in data:
-                    self.group_name = data['group_name']
-                if 'group_id' in data:
-                    self.group_id = data['group_id']
-                if 'unit_display_name' in data:
-                    self.unit_display_name = data['unit_display_name']
-                conn.execute("""
-                    UPDATE players SET last_seen = (now() AT TIME ZONE 'utc') 
-                    WHERE ucid = %s
-                """, (self.ucid, ))
+    async def update(self, data: dict):
+        if 'id' in data:
+            # if the ID has changed (due to reconnect), we need to update the server list
+            if self.id != data['id']:
+                del self.server.players[self.id]
+                self.server.players[data['id']] = self
+                self.id = data['id']
+        if 'active' in data:
+            self.active = data['active']
+        if 'name' in data and self.name != data['name']:
+            self.name = data['name']
+        if 'side' in data:
+            self.side = Side(data['side'])
+        if 'slot' in data:
+            self.slot = int(data['slot'])
+        if 'sub_slot' in data:
+            self.sub_slot = data['sub_slot']
+        if 'unit_callsign' in data:
+            self.unit_callsign = data['unit_callsign']
+        if 'unit_id' in data:
+            self.unit_id = data['unit_id']
+        if 'unit_name' in data:
+            self.unit_name = data['unit_name']
+        if 'unit_type' in data:
+            self.unit_type = data['unit_type']
+        if 'group_name' in data:
+            self.group_name = data['group_name']
+        if 'group_id' in data:
+            self.group_id = data['group_id']
+        if 'unit_display_name' in data:
+            self.unit_display_name = data['unit_display_name']
+        # name and last_seen are written in batches by the ServiceBus
+        self.bus.player_writer.update(self.ucid, self.name)
 
     def has_discord_roles(self, roles: list[str]) -> bool:
         valid_roles = []
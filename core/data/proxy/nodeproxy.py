@@ -144,6 +144,7 @@ class NodeProxy(Node):
             "command": "rpc",
             "object": "Node",
             "method": "get_available_modules",
+            "priority": "bulk",
             "params": {
                 "userid": userid,
                 "password": password
@@ -164,6 +165,7 @@ class NodeProxy(Node):
             "command": "rpc",
             "object": "Node",
             "method": "shell_command",
+            "priority": "bulk",
             "params": {
                 "cmd": cmd,
                 "timeout": timeout
@@ -176,6 +178,7 @@ class NodeProxy(Node):
             "command": "rpc",
             "object": "Node",
             "method": "read_file",
+            "priority": "bulk",
             "params": {
                 "path": path
             }
@@ -192,6 +195,7 @@ class NodeProxy(Node):
             "command": "rpc",
             "object": "Node",
             "method": "write_file",
+            "priority": "bulk",
             "params": {
                 "filename": filename,
                 "url": url,
@@ -205,6 +209,7 @@ class NodeProxy(Node):
             "command": "rpc",
             "object": "Node",
             "method": "list_directory",
+            "priority": "bulk",
             "params": {
                 "path": path,
                 "pattern": pattern,
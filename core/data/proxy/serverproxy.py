@@ -122,6 +122,7 @@ class ServerProxy(Server):
             "command": "rpc",
             "object": "Server",
             "method": "uploadMission",
+            "priority": "bulk",
             "params": {
                 "filename": filename,
                 "url": url,
@@ -136,6 +137,7 @@ class ServerProxy(Server):
             "command": "rpc",
             "object": "Server",
             "method": "listAvailableMissions",
+            "priority": "bulk",
             "server_name": self.name
         }, timeout=60, node=self.node.name)
         return data['return']
@@ -145,6 +147,7 @@ class ServerProxy(Server):
             "command": "rpc",
             "object": "Server",
             "method": "getMissionList",
+            "priority": "bulk",
             "server_name": self.name
         }, timeout=60, node=self.node.name)
         return data['return']
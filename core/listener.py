@@ -1,5 +1,6 @@
 from __future__ import annotations
 import inspect
+from collections.abc import ItemsView, ValuesView
 from dataclasses import MISSING
 from typing import TypeVar, TYPE_CHECKING, Any, Type, Optional, Iterable, Callable
 
@@ -8,6 +9,7 @@ if TYPE_CHECKING:
     from services import DCSServerBot
 
 __all__ = [
+    "EventData",
     "Event",
     "event",
     "ChatCommand",
@@ -17,6 +19,133 @@ __all__ = [
 ]
 
 
+class EventData(dict):
+    """
+    A copy-on-write view of an event payload.
+
+    Each listener gets its own EventData on top of the very same payload. Only the top level is copied, which is cheap.
+    Nested dicts and lists stay shared with the payload until a listener accesses them (by key, get(), items(),
+    values(), iteration, copy() or unpacking), then they are copied one level at a time. Changes a listener makes will
+    not be visible to any other listener, unless it bypasses these methods (e.g. with dict.__getitem__).
+    """
+
+    def __init__(self, data: Optional[dict] = None):
+        # a copy of another EventData must not share the values that one has copied already
+        super().__init__(dict.items(data) if isinstance(data, EventData) else (data or {}))
+        self._owned: set = set()
+
+    @staticmethod
+    def _wrap(value: Any) -> Any:
+        if isinstance(value, dict):
+            return EventData(value)
+        elif isinstance(value, list):
+            return EventList(value)
+        return value
+
+    def _own(self, key: Any, value: Any) -> Any:
+        if key in self._owned:
+            return value
+        wrapped = self._wrap(value)
+        if wrapped is not value:
+            super().__setitem__(key, wrapped)
+            self._owned.add(key)
+        return wrapped
+
+    def __getitem__(self, key: Any) -> Any:
+        return self._own(key, super().__getitem__(key))
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        super().__setitem__(key, value)
+        self._owned.add(key)
+
+    def __iter__(self):
+        # overriding this makes dict(), {**data} and dict.update() read the values through __getitem__
+        return super().__iter__()
+
+    def __or__(self, other: dict) -> EventData:
+        data = self.copy()
+        data.update(other)
+        return data
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        if key not in self:
+            return default
+        return self[key]
+
+    def items(self) -> ItemsView:
+        return ItemsView(self)
+
+    def values(self) -> ValuesView:
+        return ValuesView(self)
+
+    def copy(self) -> EventData:
+        return EventData(self)
+
+    def setdefault(self, key: Any, default: Any = None) -> Any:
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def pop(self, key: Any, *args) -> Any:
+        if key not in self:
+            return super().pop(key, *args)
+        value = self[key]
+        super().pop(key)
+        self._owned.discard(key)
+        return value
+
+    def popitem(self) -> tuple[Any, Any]:
+        key, value = super().popitem()
+        if key in self._owned:
+            self._owned.discard(key)
+            return key, value
+        return key, self._wrap(value)
+
+
+class EventList(list):
+    """
+    The list counterpart of EventData.
+    """
+
+    def __init__(self, data: Iterable = ()):
+        if isinstance(data, EventList):
+            # a copy of another EventList must not share the elements that one has copied already
+            data = [EventData._wrap(x) if isinstance(x, (EventData, EventList)) else x for x in list.__iter__(data)]
+        super().__init__(data)
+
+    def _own(self, index: int, value: Any) -> Any:
+        if isinstance(value, (EventData, EventList)):
+            return value
+        wrapped = EventData._wrap(value)
+        if wrapped is not value:
+            super().__setitem__(index, wrapped)
+        return wrapped
+
+    def __getitem__(self, index: Any) -> Any:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return self._own(index, super().__getitem__(index))
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __reversed__(self):
+        for i in reversed(range(len(self))):
+            yield self[i]
+
+    def __add__(self, other: list) -> list:
+        return list(self) + list(other)
+
+    def copy(self) -> EventList:
+        return EventList(self)
+
+    def pop(self, index: int = -1) -> Any:
+        value = self[index]
+        super().pop(index)
+        return value
+
+
 def event(name: str = MISSING, cls: Type[Event] = MISSING, **attrs) -> Callable[[Any], Event]:
     if cls is MISSING:
         cls = Event
@@ -1,10 +1,36 @@
 import asyncio
+import base64
+import json
 import psycopg
+import threading
+import zlib
 
-from contextlib import suppress
-from typing import Callable
+from collections import deque
+from itertools import groupby
+from typing import Callable, Optional, Union
 
 from core.data.impl.nodeimpl import NodeImpl
+from core.utils.metrics import Histogram
+
+# max number of messages that are claimed at once
+BATCH_SIZE = 100
+# time to wait for more messages, before they are written to the database
+PUBLISH_DELAY = 0.005
+# messages larger than this (in bytes) are stored compressed
+COMPRESS_THRESHOLD = 8192
+# buckets for the message size statistics (in bytes)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+# node of the messages that are sent to several nodes at once
+ALL_NODES = '*'
+# messages that were not acknowledged by all their recipients in this time (in seconds) are removed
+EXPIRE_AFTER = 300
+# priority lanes, every lane is consumed separately, so control messages never wait behind bulk transfers
+CONTROL = 0
+BULK = 1
+LANES = (CONTROL, BULK)
+# backoff (in seconds) after the database connection was lost, doubled on every failed attempt
+RECONNECT_DELAY = 0.1
+MAX_RECONNECT_DELAY = 5.0
 
 
 class PubSub:
@@ -15,58 +41,334 @@ class PubSub:
         self.log = node.log
         self.url = url
         self._stop_event = asyncio.Event()
+        # set on every NOTIFY for us (per lane), multiple notifications while we are draining are merged into one
+        self._wakeup: dict[int, asyncio.Event] = {lane: asyncio.Event() for lane in LANES}
+        # lanes that have to catch up with messages sent while we were not listening
+        self._recovering: set[int] = set()
+        # outgoing messages, written by one flush task at a time to keep the order
+        self.loop = asyncio.get_event_loop()
+        # entries are (node, lane, payload) or (list of nodes, lane, payload) for messages to several nodes
+        self._outbox: deque[tuple[Union[str, list[str]], int, str]] = deque()
+        self._lock = threading.Lock()
+        self._scheduled = False
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+        # uncompressed message sizes per command
+        self.sizes: dict[str, Histogram] = {}
+        # connection statistics
+        self.reconnects = 0
+        self.recovered = 0
+
+    async def _claim(self, conn: psycopg.AsyncConnection, lane: int) -> list[tuple[int, dict]]:
+        # claim the next batch of messages atomically, other consumers skip the locked rows
+        cursor = await conn.execute(f"""
+            WITH batch AS (
+                SELECT id 
+                FROM {self.name} 
+                WHERE guild_id = %(guild_id)s AND node = %(node)s AND priority = %(lane)s 
+                ORDER BY id 
+                LIMIT %(limit)s
+                FOR UPDATE SKIP LOCKED
+            )
+            DELETE FROM {self.name} t USING batch WHERE t.id = batch.id
+            RETURNING t.id, t.data
+        """, {
+            'guild_id': self.node.guild_id,
+            'node': "Master" if self.node.master else self.node.name,
+            'lane': lane,
+            'limit': BATCH_SIZE
+        })
+        # RETURNING does not keep the order
+        return sorted(await cursor.fetchall(), key=lambda x: x[0])
+
+    async def _claim_shared(self, conn: psycopg.AsyncConnection, lane: int) -> list[tuple[int, dict]]:
+        # messages to several nodes are stored once, every recipient acknowledges them instead of deleting them
+        cursor = await conn.execute(f"""
+            WITH batch AS (
+                SELECT t.id 
+                FROM {self.name} t 
+                WHERE t.guild_id = %(guild_id)s AND t.node = %(all)s AND t.priority = %(lane)s 
+                AND %(node)s = ANY(t.recipients)
+                AND NOT EXISTS (SELECT 1 FROM {self.name}_acks a WHERE a.id = t.id AND a.node = %(node)s)
+                ORDER BY t.id 
+                LIMIT %(limit)s
+            ), acked AS (
+                INSERT INTO {self.name}_acks (id, node) 
+                SELECT id, %(node)s FROM batch 
+                ON CONFLICT DO NOTHING 
+                RETURNING id
+            )
+            SELECT t.id, t.data FROM {self.name} t JOIN acked ON t.id = acked.id ORDER BY t.id
+        """, {
+            'guild_id': self.node.guild_id,
+            'all': ALL_NODES,
+            'node': self.node.name,
+            'lane': lane,
+            'limit': BATCH_SIZE
+        })
+        return await cursor.fetchall()
 
-    async def _process(self, cursor: psycopg.AsyncCursor, handler: Callable):
-        ids_to_delete = []
-        await cursor.execute(f"""
-            SELECT id, data 
-            FROM {self.name} 
-            WHERE guild_id = %(guild_id)s AND node = %(node)s 
-            ORDER BY id
+    async def _cleanup_shared(self, conn: psycopg.AsyncConnection) -> None:
+        # remove the messages that all recipients have acknowledged or that are expired, the acks are removed
+        # by the database (ON DELETE CASCADE)
+        await conn.execute(f"""
+            DELETE FROM {self.name} t 
+            WHERE t.guild_id = %(guild_id)s AND t.node = %(all)s 
+            AND (
+                t.time < ((now() AT TIME ZONE 'utc') - %(expire)s * interval '1 second')
+                OR (SELECT COUNT(*) FROM {self.name}_acks a WHERE a.id = t.id) >= cardinality(t.recipients)
+            )
         """, {
             'guild_id': self.node.guild_id,
-            'node': "Master" if self.node.master else self.node.name
+            'all': ALL_NODES,
+            'expire': EXPIRE_AFTER
         })
-        async for row in cursor:
+
+    async def _process(self, handler: Callable, lane: int):
+        delay = RECONNECT_DELAY
+        while not self._stop_event.is_set():
+            await self._wakeup[lane].wait()
+            self._wakeup[lane].clear()
+            if self._stop_event.is_set():
+                break
+            recovering = lane in self._recovering
+            self._recovering.discard(lane)
             try:
-                # noinspection PyAsyncCall
-                asyncio.create_task(handler(row[1]))
+                async with self.node.apool.connection() as conn:
+                    acked = False
+                    while True:
+                        async with conn.transaction():
+                            rows = await self._claim(conn, lane)
+                            shared = await self._claim_shared(conn, lane)
+                        acked |= bool(shared)
+                        if recovering:
+                            self.recovered += len(rows) + len(shared)
+                        for _, data in sorted(rows + shared, key=lambda x: x[0]):
+                            try:
+                                # noinspection PyAsyncCall
+                                asyncio.create_task(handler(self._decode(data)))
+                            except Exception as ex:
+                                self.log.exception(ex)
+                        if len(rows) < BATCH_SIZE and len(shared) < BATCH_SIZE:
+                            break
+                    # our acks are committed now, so whoever acknowledges last sees all of them
+                    if acked:
+                        async with conn.transaction():
+                            await self._cleanup_shared(conn)
+                delay = RECONNECT_DELAY
+            except psycopg.OperationalError as ex:
+                self.log.warning(f"{self.name.title()}: {ex}, retrying in {delay:.1f}s.")
+                # the messages are still waiting, so don't wait for the next notification
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, MAX_RECONNECT_DELAY)
+                self._wake(lane, recover=True)
             except Exception as ex:
                 self.log.exception(ex)
-            finally:
-                ids_to_delete.append(row[0])
-        if ids_to_delete:
-            await cursor.execute(f"DELETE FROM {self.name} WHERE id = ANY(%s::int[])",
-                                 (ids_to_delete,))
 
     async def subscribe(self, handler: Callable):
-        while True:
-            with suppress(psycopg.OperationalError):
-                async with self.node.apool.connection() as conn:
-                    try:
-                        await conn.set_autocommit(True)
-                        async with conn.cursor() as cursor:
-                            # preprocess all rows that might be there
-                            await cursor.execute(f"LISTEN {self.name}")
-                            await self._process(cursor, handler)
+        # every lane has its own drain task (and database connection)
+        drains = [asyncio.create_task(self._process(handler, lane)) for lane in LANES]
+        delay = RECONNECT_DELAY
+        listening = False
+        try:
+            while not self._stop_event.is_set():
+                try:
+                    async with self.node.apool.connection() as conn:
+                        try:
+                            await conn.set_autocommit(True)
+                            # the notifications on {name} only carry the node, they are kept for nodes that run an older version
+                            await conn.execute(f"LISTEN {self.name}_lanes")
+                            if listening:
+                                self.reconnects += 1
+                                self.log.info(f"{self.name.title()}: listening again after a connection loss.")
+                            # process all rows that might be there already or were sent while we were not listening
+                            self._wake(recover=listening)
+                            listening = True
+                            delay = RECONNECT_DELAY
                             gen = conn.notifies()
                             async for n in gen:
                                 if self._stop_event.is_set():
                                     self.log.debug(f'- {self.name.title()} stopped.')
                                     await gen.aclose()
                                     return
-                                node = n.payload
-                                if node == self.node.name or (self.node.master and node == 'Master'):
-                                    await self._process(cursor, handler)
-                    finally:
-                        await conn.set_autocommit(False)
-
-    # TODO: dirty, needs to be changed when we use AsyncPG in general
-    def publish(self, conn: psycopg.Connection, data: dict) -> None:
-        conn.execute(f"""
-                INSERT INTO {self.name} (guild_id, node, data) 
-                VALUES (%(guild_id)s, %(node)s, %(data)s)
-            """, data)
+                                # the payload is node:lane
+                                node, _, lane = n.payload.rpartition(':')
+                                if node in [self.node.name, ALL_NODES] or (self.node.master and node == 'Master'):
+                                    self._wake(int(lane))
+                        finally:
+                            await conn.set_autocommit(False)
+                except psycopg.OperationalError as ex:
+                    self.log.warning(f"{self.name.title()}: connection lost ({ex}), reconnecting in {delay:.1f}s.")
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, MAX_RECONNECT_DELAY)
+        finally:
+            for drain in drains:
+                drain.cancel()
+
+    def _wake(self, lane: Optional[int] = None, recover: bool = False) -> None:
+        for key, event in self._wakeup.items():
+            if lane is None or key == lane:
+                if recover:
+                    self._recovering.add(key)
+                event.set()
+
+    def publish(self, node: str, data: dict) -> None:
+        """
+        Sends a message to a node. Can be called from any thread, the message is written asynchronously.
+        """
+        payload = self._encode(data)
+        with self._lock:
+            self._outbox.append((node, self._lane(data), payload))
+            if self._scheduled:
+                return
+            self._scheduled = True
+        self.loop.call_soon_threadsafe(self._schedule_flush, PUBLISH_DELAY)
+
+    def publish_all(self, nodes: list[str], data: dict) -> None:
+        """
+        Sends a message to several nodes. It is stored only once and removed, when all nodes have received it.
+        Can be called from any thread, the message is written asynchronously.
+        """
+        if not nodes:
+            return
+        payload = self._encode(data)
+        with self._lock:
+            self._outbox.append((list(nodes), self._lane(data), payload))
+            if self._scheduled:
+                return
+            self._scheduled = True
+        self.loop.call_soon_threadsafe(self._schedule_flush, PUBLISH_DELAY)
+
+    @staticmethod
+    def _lane(data: dict) -> int:
+        # producers mark bulk messages (file transfers, directory listings, ...) with "priority": "bulk"
+        return BULK if data.get('priority') == 'bulk' else CONTROL
+
+    def _encode(self, data: dict) -> str:
+        payload = json.dumps(data)
+        key = data.get('command', 'unknown')
+        if data.get('method'):
+            key += ':' + data['method']
+        if key not in self.sizes:
+            self.sizes[key] = Histogram(SIZE_BUCKETS)
+        self.sizes[key].observe(len(payload))
+        if len(payload) > COMPRESS_THRESHOLD:
+            payload = json.dumps({
+                "__compressed__": "zlib",
+                "payload": base64.b64encode(zlib.compress(payload.encode('utf-8'))).decode('ascii')
+            })
+        return payload
+
+    @staticmethod
+    def _decode(data: dict) -> dict:
+        if isinstance(data, dict) and data.get('__compressed__') == 'zlib':
+            return json.loads(zlib.decompress(base64.b64decode(data['payload'])))
+        return data
+
+    def get_size_stats(self, reset: bool = False) -> dict[str, dict]:
+        """
+        Returns the message size statistics (in bytes, uncompressed) per command, largest first.
+        """
+        sizes = self.sizes
+        if reset:
+            # publish() can be called from any thread, so don't clear the dict they might be using
+            self.sizes = {}
+        return {
+            key: value.to_dict()
+            for key, value in sorted(list(sizes.items()), key=lambda x: x[1].sum, reverse=True)
+        }
+
+    def get_connection_stats(self, reset: bool = False) -> dict[str, int]:
+        """
+        Returns the number of reconnects of the listener and of the messages that were received afterwards.
+        """
+        stats = {
+            "reconnects": self.reconnects,
+            "recovered": self.recovered
+        }
+        if reset:
+            self.reconnects = self.recovered = 0
+        return stats
+
+    def _schedule_flush(self, delay: float) -> None:
+        self._flush_task = asyncio.create_task(self._flush(delay))
+
+    async def _flush(self, delay: float = 0) -> None:
+        if delay:
+            await asyncio.sleep(delay)
+        async with self._flush_lock:
+            with self._lock:
+                batch = list(self._outbox)
+                self._outbox.clear()
+                self._scheduled = False
+            if not batch:
+                return
+            try:
+                await self._write(batch)
+            except psycopg.OperationalError as ex:
+                self.log.warning(f"{self.name.title()}: {ex}, retrying.")
+                self._requeue(batch)
+            except Exception as ex:
+                if len(batch) == 1:
+                    self.log.error(f"{self.name.title()}: message to node {batch[0][0]} dropped: {ex}")
+                    return
+                # one bad message must not block the others, write them one by one to find it
+                for idx, entry in enumerate(batch):
+                    try:
+                        await self._write([entry])
+                    except psycopg.OperationalError as ex:
+                        self.log.warning(f"{self.name.title()}: {ex}, retrying.")
+                        self._requeue(batch[idx:])
+                        return
+                    except Exception as ex:
+                        self.log.error(f"{self.name.title()}: message to node {entry[0]} dropped: {ex}")
+
+    async def _write(self, batch: list[tuple[Union[str, list[str]], int, str]]) -> None:
+        async with self.node.apool.connection() as conn:
+            async with conn.transaction():
+                # the ids decide the order in which the messages are received, so write them in the order of the
+                # outbox: one statement per run of messages to single nodes, one per message to several nodes
+                for shared, run in groupby(batch, key=lambda x: isinstance(x[0], list)):
+                    run = list(run)
+                    if not shared:
+                        # the notifications per node are merged on commit
+                        await conn.execute(f"""
+                            INSERT INTO {self.name} (guild_id, node, priority, data) 
+                            SELECT %s, t.node, t.priority, t.data::json 
+                            FROM unnest(%s::text[], %s::smallint[], %s::text[]) 
+                                WITH ORDINALITY AS t(node, priority, data, idx)
+                            ORDER BY t.idx
+                        """, (self.node.guild_id, [x[0] for x in run], [x[1] for x in run], [x[2] for x in run]))
+                        continue
+                    for nodes, lane, payload in run:
+                        await conn.execute(f"""
+                            INSERT INTO {self.name} (guild_id, node, recipients, priority, data) 
+                            VALUES (%s, %s, %s, %s, %s::json)
+                        """, (self.node.guild_id, ALL_NODES, nodes, lane, payload))
+                if any(isinstance(x[0], list) for x in batch):
+                    await self._cleanup_shared(conn)
+
+    def _requeue(self, batch: list[tuple[Union[str, list[str]], int, str]]) -> None:
+        # the database is not available, put the messages back in front and try again later
+        with self._lock:
+            self._outbox.extendleft(reversed(batch))
+            if self._scheduled:
+                return
+            self._scheduled = True
+        self._schedule_flush(1.0)
+
+    async def pending(self, node: str) -> bool:
+        """
+        Returns True, if messages to the given node are still waiting to be written or to be received by the node.
+        """
+        await self._flush()
+        with self._lock:
+            if any(x[0] == node for x in self._outbox):
+                return True
+        async with self.node.apool.connection() as conn:
+            cursor = await conn.execute(f"SELECT 1 FROM {self.name} WHERE guild_id = %s AND node = %s LIMIT 1",
+                                        (self.node.guild_id, node))
+            return await cursor.fetchone() is not None
 
     async def clear(self):
         async with self.node.apool.connection() as conn:
@@ -81,14 +383,23 @@ class PubSub:
                 else:
                     await conn.execute(f"DELETE FROM {self.name} WHERE guild_id = %s AND node = %s",
                                        (self.node.guild_id, self.node.name))
+                # skip the messages to several nodes that are left from before our start
+                await conn.execute(f"""
+                    INSERT INTO {self.name}_acks (id, node) 
+                    SELECT id, %(node)s FROM {self.name} 
+                    WHERE guild_id = %(guild_id)s AND node = %(all)s AND %(node)s = ANY(recipients) 
+                    ON CONFLICT DO NOTHING
+                """, {'guild_id': self.node.guild_id, 'node': self.node.name, 'all': ALL_NODES})
+                await self._cleanup_shared(conn)
             finally:
                 await conn.set_autocommit(False)
 
     async def close(self):
+        await self._flush()
         async with self.node.apool.connection() as conn:
             try:
                 await conn.set_autocommit(True)
                 self._stop_event.set()
-                await conn.execute(f"NOTIFY {self.name}")
+                await conn.execute(f"NOTIFY {self.name}_lanes")
             finally:
                 await conn.set_autocommit(False)
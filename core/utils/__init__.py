@@ -1,6 +1,8 @@
 from .campaigns import *
 from .coalitions import *
+from .database import *
 from .dcs import *
 from .discord import *
 from .helper import *
+from .metrics import *
 from .os import *
@@ -0,0 +1,289 @@
+from __future__ import annotations
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+
+from contextlib import contextmanager, asynccontextmanager
+from psycopg import Connection, AsyncConnection, Cursor, AsyncCursor
+from psycopg_pool import ConnectionPool, AsyncConnectionPool
+from typing import Iterator, AsyncIterator, Optional, Union
+
+from .metrics import Histogram
+
+__all__ = [
+    "BlockingCallDetector",
+    "PoolMonitor",
+    "MonitoredConnectionPool",
+    "MonitoredAsyncConnectionPool",
+    "PreparedStatements"
+]
+
+# a checkout that had to wait longer than this (in ms) for a connection counts as a saturation event
+SATURATION_THRESHOLD = 10.0
+# number of quiet intervals before an adaptive pool shrinks again
+SHRINK_AFTER = 6
+# room in the prepared statement cache of a connection for the statements that are not registered
+PREPARED_HEADROOM = 100
+
+
+class BlockingCallDetector:
+    """
+    Records the synchronous database calls that are made on the thread of the event loop, with their call site and
+    how long they blocked the loop.
+    """
+
+    def __init__(self, log: logging.Logger, threshold: float = 50.0):
+        self.log = log
+        # calls that take longer than this (in ms) are logged right away
+        self.threshold = threshold
+        # call site => durations in ms
+        self.sites: dict[str, Histogram] = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def on_event_loop() -> bool:
+        try:
+            asyncio.get_running_loop()
+            return True
+        except RuntimeError:
+            return False
+
+    @staticmethod
+    def call_site() -> str:
+        # the first frame outside of this module and contextlib is the caller
+        frame = sys._getframe(1)
+        while frame and frame.f_code.co_filename in [__file__, contextmanager.__code__.co_filename,
+                                                     asynccontextmanager.__code__.co_filename]:
+            frame = frame.f_back
+        if not frame:
+            return 'unknown'
+        filename = os.path.relpath(frame.f_code.co_filename)
+        return f"{filename}:{frame.f_lineno} ({frame.f_code.co_name})"
+
+    def record(self, site: str, duration: float) -> None:
+        with self.lock:
+            if site not in self.sites:
+                self.sites[site] = Histogram()
+            self.sites[site].observe(duration)
+        if duration > self.threshold:
+            self.log.warning(f"Event loop blocked for {duration:.0f} ms by a database call in {site}")
+
+    def get_stats(self) -> dict[str, dict]:
+        """
+        Returns the durations (in ms) of the blocking calls per call site, the ones that blocked the longest first.
+        """
+        with self.lock:
+            return {
+                site: value.to_dict()
+                for site, value in sorted(self.sites.items(), key=lambda x: x[1].sum, reverse=True)
+            }
+
+    def report(self, top: int = 20) -> None:
+        stats = self.get_stats()
+        if not stats:
+            return
+        self.log.warning("Synchronous database calls on the event loop:")
+        for site, value in list(stats.items())[:top]:
+            self.log.warning(f"  {value['count']:>6}x, {value['avg']:>7.1f} ms avg, {value['max']:>7.1f} ms max, "
+                             f"{value['count'] * value['avg'] / 1000:>7.1f} s total - {site}")
+
+
+class PoolMonitor:
+    """
+    Collects the telemetry of a connection pool: how long requests wait for a connection, how long connections are
+    checked out and how often the pool is saturated.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.wait = Histogram()
+        self.checkout = Histogram()
+        self.lock = threading.Lock()
+        self.in_use = 0
+        # statistics, reset on every call of stats()
+        self.saturated = 0
+        self.peak = 0
+        # the same for the adaptive sizing, reset on every call of window()
+        self.window_saturated = 0
+        self.window_peak = 0
+        # intervals without saturation in a row
+        self.quiet = 0
+
+    def acquired(self, wait: float) -> None:
+        self.wait.observe(wait)
+        with self.lock:
+            self.in_use += 1
+            self.peak = max(self.peak, self.in_use)
+            self.window_peak = max(self.window_peak, self.in_use)
+            if wait > SATURATION_THRESHOLD:
+                self.saturated += 1
+                self.window_saturated += 1
+
+    def released(self, duration: float) -> None:
+        self.checkout.observe(duration)
+        with self.lock:
+            self.in_use -= 1
+
+    def window(self) -> tuple[int, int]:
+        """
+        Returns the saturation events and the max number of connections in use since the last call.
+        """
+        with self.lock:
+            rc = self.window_saturated, self.window_peak
+            self.window_saturated = 0
+            self.window_peak = self.in_use
+            return rc
+
+    def stats(self) -> dict:
+        """
+        Returns the wait and checkout times (in ms), the saturation events and the max number of connections in use
+        since the last call.
+        """
+        with self.lock:
+            stats = {
+                "wait": self.wait.to_dict(),
+                "checkout": self.checkout.to_dict(),
+                "saturated": self.saturated,
+                "peak": self.peak
+            }
+            self.saturated = 0
+            self.peak = self.in_use
+        for histogram in [self.wait, self.checkout]:
+            with histogram.lock:
+                histogram.reset()
+        return stats
+
+    def next_size(self, current: int, lower: int, upper: int) -> Optional[int]:
+        """
+        Returns the new max size of an adaptive pool or None, if it should stay as it is.
+        The pool grows fast, if requests had to wait, and shrinks slowly after some quiet intervals.
+        """
+        saturated, peak = self.window()
+        if saturated:
+            self.quiet = 0
+            if current < upper:
+                return min(current + max(1, current // 2), upper)
+            return None
+        self.quiet += 1
+        if self.quiet >= SHRINK_AFTER and current > lower and peak < current:
+            self.quiet = 0
+            return max(current - 1, peak + 1, lower)
+        return None
+
+
+class MonitoredConnectionPool(ConnectionPool):
+    """
+    ConnectionPool that reports its telemetry to a PoolMonitor.
+    If a BlockingCallDetector is given, every connection that is checked out on the thread of the event loop is
+    reported to it as well. The time is measured from the checkout until the connection is given back.
+    """
+
+    def __init__(self, *args, monitor: PoolMonitor, detector: Optional[BlockingCallDetector] = None,
+                 limits: Optional[tuple[int, int]] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.monitor = monitor
+        self.detector = detector
+        # lower and upper limit of the max size, if the pool is adaptive
+        self.limits = limits
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None) -> Iterator[Connection]:
+        site = self.detector.call_site() if self.detector and self.detector.on_event_loop() else None
+        start = time.perf_counter()
+        try:
+            with super().connection(timeout) as conn:
+                acquired = time.perf_counter()
+                self.monitor.acquired((acquired - start) * 1000)
+                try:
+                    yield conn
+                finally:
+                    self.monitor.released((time.perf_counter() - acquired) * 1000)
+        finally:
+            if site:
+                self.detector.record(site, (time.perf_counter() - start) * 1000)
+
+    def adapt(self) -> Optional[int]:
+        """
+        Resizes an adaptive pool according to the observed waits. Returns the new max size, if it was changed.
+        """
+        if not self.limits:
+            return None
+        size = self.monitor.next_size(self.max_size, *self.limits)
+        if size:
+            self.resize(min(self.min_size, size), size)
+        return size
+
+
+class MonitoredAsyncConnectionPool(AsyncConnectionPool):
+    """
+    AsyncConnectionPool that reports its telemetry to a PoolMonitor.
+    """
+
+    def __init__(self, *args, monitor: PoolMonitor, limits: Optional[tuple[int, int]] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.monitor = monitor
+        # lower and upper limit of the max size, if the pool is adaptive
+        self.limits = limits
+
+    @asynccontextmanager
+    async def connection(self, timeout: Optional[float] = None) -> AsyncIterator[AsyncConnection]:
+        start = time.perf_counter()
+        async with super().connection(timeout) as conn:
+            acquired = time.perf_counter()
+            self.monitor.acquired((acquired - start) * 1000)
+            try:
+                yield conn
+            finally:
+                self.monitor.released((time.perf_counter() - acquired) * 1000)
+
+    async def adapt(self) -> Optional[int]:
+        """
+        Resizes an adaptive pool according to the observed waits. Returns the new max size, if it was changed.
+        """
+        if not self.limits:
+            return None
+        size = self.monitor.next_size(self.max_size, *self.limits)
+        if size:
+            await self.resize(min(self.min_size, size), size)
+        return size
+
+
+class PreparedStatements:
+    """
+    Registry of the hot statements, the ones that run on every event or in short intervals.
+
+    A registered statement is prepared on the server on its first execution on a connection and only executed by
+    name afterwards, so it does not have to be parsed and planned again. The statement cache of every connection
+    that runs one is sized, so that the hot statements are not evicted by the other queries.
+    """
+    # can be disabled for connection poolers that do not support prepared statements (e.g. pgbouncer)
+    enabled = True
+    # name => sql
+    statements: dict[str, str] = {}
+
+    @classmethod
+    def register(cls, name: str, sql: str) -> None:
+        if cls.statements.get(name, sql) != sql:
+            raise ValueError(f"Statement {name} is already registered with a different query")
+        cls.statements[name] = sql
+
+    @classmethod
+    def _prepare(cls, conn: Union[Connection, AsyncConnection], name: str) -> tuple[str, Optional[bool]]:
+        if not cls.enabled:
+            return cls.statements[name], None
+        if conn.prepared_max < len(cls.statements) + PREPARED_HEADROOM:
+            conn.prepared_max = len(cls.statements) + PREPARED_HEADROOM
+        return cls.statements[name], True
+
+    @classmethod
+    def execute(cls, conn: Connection, name: str, params=None) -> Cursor:
+        sql, prepare = cls._prepare(conn, name)
+        return conn.execute(sql, params, prepare=prepare)
+
+    @classmethod
+    async def aexecute(cls, conn: AsyncConnection, name: str, params=None) -> AsyncCursor:
+        sql, prepare = cls._prepare(conn, name)
+        return await conn.execute(sql, params, prepare=prepare)
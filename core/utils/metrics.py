@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import bisect
+import threading
+
+from typing import Optional
+
+__all__ = [
+    "Histogram"
+]
+
+# default bucket bounds in milliseconds
+DEFAULT_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+
+
+class Histogram:
+    """
+    Thread-safe histogram with fixed buckets.
+    Percentiles are approximated by the upper bound of the bucket they fall into.
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        # the last bucket takes everything above the highest bound
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        with self.lock:
+            self.counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.count += 1
+            self.sum += value
+            self.max = max(self.max, value)
+
+    def percentile(self, p: float) -> Optional[float]:
+        with self.lock:
+            if not self.count:
+                return None
+            rank = p / 100 * self.count
+            total = 0
+            for idx, count in enumerate(self.counts):
+                total += count
+                if total >= rank:
+                    return self.buckets[idx] if idx < len(self.buckets) else self.max
+            return self.max
+
+    @property
+    def avg(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "avg": self.avg,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "max": self.max
+        }
@@ -1,6 +1,7 @@
 import asyncio
 import discord
 import os
+import psycopg
 import shutil
 
 from core import utils, Plugin, Server, command, Node, UploadStatus, Group, Instance, Status, PlayerType, \
@@ -174,6 +175,14 @@ class Admin(Plugin):
             config = super().read_locals()
         return config
 
+    async def prune(self, conn: psycopg.AsyncConnection, *, days: int = -1, ucids: list[str] = None,
+                    server: Optional[str] = None) -> None:
+        if server:
+            await conn.execute("DELETE FROM queuestats WHERE server_name = %s", (server, ))
+
+    async def rename(self, conn: psycopg.AsyncConnection, old_name: str, new_name: str):
+        await conn.execute('UPDATE queuestats SET server_name = %s WHERE server_name = %s', (new_name, old_name))
+
     dcs = Group(name="dcs", description=_("Commands to manage your DCS installations"))
 
     @dcs.command(description=_('Bans a user by name or ucid'))
@@ -659,15 +668,16 @@ class Admin(Plugin):
             await interaction.followup.send(_('Aborted.'), ephemeral=ephemeral)
             return
         if method != 'upgrade' or node:
-            for n in await self.node.get_active_nodes():
-                if not node or n == node.name:
-                    self.bus.send_to_node({
-                        "command": "rpc",
-                        "object": "Node",
-                        "method": method
-                    }, node=n)
-                    await interaction.followup.send(_('Node {node} - {method} sent.').format(node=n, method=method),
-                                                    ephemeral=ephemeral)
+            nodes = await self.node.get_active_nodes()
+            if node:
+                nodes = [x for x in nodes if x == node.name]
+            for n in await self.bus.send_to_all_nodes({
+                "command": "rpc",
+                "object": "Node",
+                "method": method
+            }, nodes=nodes):
+                await interaction.followup.send(_('Node {node} - {method} sent.').format(node=n, method=method),
+                                                ephemeral=ephemeral)
         if not node or node.name == self.node.name:
             await interaction.followup.send(
                 (_("All nodes are") if not node else _("Master is")) + _(' going to {} **NOW**.').format(method),
@@ -1,3 +1,9 @@
-CREATE TABLE nodestats (id SERIAL PRIMARY KEY, node TEXT NOT NULL, pool_size INTEGER NOT NULL, pool_available INTEGER NOT NULL, requests_waiting INTEGER NOT NULL, requests_wait_ms INTEGER NOT NULL, workers INTEGER NOT NULL, qsize INTEGER NOT NULL, time TIMESTAMP NOT NULL DEFAULT (NOW() AT TIME ZONE 'utc'));
+CREATE TABLE nodestats (id SERIAL PRIMARY KEY, node TEXT NOT NULL, pool_size INTEGER NOT NULL, pool_available INTEGER NOT NULL, requests_waiting INTEGER NOT NULL, requests_wait_ms INTEGER NOT NULL, workers INTEGER NOT NULL, qsize INTEGER NOT NULL DEFAULT 0, events INTEGER NOT NULL DEFAULT 0, events_dropped INTEGER NOT NULL DEFAULT 0, event_latency_ms INTEGER NOT NULL DEFAULT 0, event_latency_max_ms INTEGER NOT NULL DEFAULT 0, pool_wait_ms INTEGER NOT NULL DEFAULT 0, pool_checkout_ms INTEGER NOT NULL DEFAULT 0, pool_saturated INTEGER NOT NULL DEFAULT 0, reconnects INTEGER NOT NULL DEFAULT 0, messages_recovered INTEGER NOT NULL DEFAULT 0, time TIMESTAMP NOT NULL DEFAULT (NOW() AT TIME ZONE 'utc'));
 CREATE INDEX IF NOT EXISTS idx_nodestats_node ON nodestats(node);
 CREATE INDEX IF NOT EXISTS idx_nodestats_time ON nodestats(time);
+CREATE TABLE IF NOT EXISTS queuestats (id SERIAL PRIMARY KEY, node TEXT NOT NULL, server_name TEXT NOT NULL, qsize INTEGER NOT NULL DEFAULT 0, events INTEGER NOT NULL DEFAULT 0, events_dropped INTEGER NOT NULL DEFAULT 0, events_coalesced INTEGER NOT NULL DEFAULT 0, event_latency_ms INTEGER NOT NULL DEFAULT 0, event_latency_max_ms INTEGER NOT NULL DEFAULT 0, time TIMESTAMP NOT NULL DEFAULT (NOW() AT TIME ZONE 'utc'));
+CREATE INDEX IF NOT EXISTS idx_queuestats_node ON queuestats(node);
+CREATE INDEX IF NOT EXISTS idx_queuestats_time ON queuestats(time);
+CREATE TABLE IF NOT EXISTS busstats (id SERIAL PRIMARY KEY, node TEXT NOT NULL, kind TEXT NOT NULL, name TEXT NOT NULL, count INTEGER NOT NULL DEFAULT 0, avg REAL NOT NULL DEFAULT 0, p95 REAL, max REAL NOT NULL DEFAULT 0, timeouts INTEGER NOT NULL DEFAULT 0, time TIMESTAMP NOT NULL DEFAULT (NOW() AT TIME ZONE 'utc'));
+CREATE INDEX IF NOT EXISTS idx_busstats_node ON busstats(node);
+CREATE INDEX IF NOT EXISTS idx_busstats_time ON busstats(time);
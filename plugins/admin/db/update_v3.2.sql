@@ -0,0 +1,4 @@
+ALTER TABLE nodestats ADD COLUMN IF NOT EXISTS events INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE nodestats ADD COLUMN IF NOT EXISTS events_dropped INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE nodestats ADD COLUMN IF NOT EXISTS event_latency_ms INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE nodestats ADD COLUMN IF NOT EXISTS event_latency_max_ms INTEGER NOT NULL DEFAULT 0;
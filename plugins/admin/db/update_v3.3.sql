@@ -0,0 +1,3 @@
+ALTER TABLE nodestats ADD COLUMN IF NOT EXISTS pool_wait_ms INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE nodestats ADD COLUMN IF NOT EXISTS pool_checkout_ms INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE nodestats ADD COLUMN IF NOT EXISTS pool_saturated INTEGER NOT NULL DEFAULT 0;
@@ -9,7 +9,8 @@ class NodeStats(report.MultiGraphElement):
 
     async def render(self, node: str, period: str):
         sql = """
-            SELECT date_trunc('minute', time) AS time, pool_size, requests_waiting, requests_wait_ms, workers, qsize
+            SELECT date_trunc('minute', time) AS time, pool_size, requests_waiting, requests_wait_ms, workers, qsize, 
+                   events, events_dropped, event_latency_max_ms, pool_wait_ms, pool_checkout_ms, pool_saturated
             FROM nodestats 
             WHERE time > ((NOW() AT TIME ZONE 'UTC') - ('1 ' || %s)::interval)
             AND node = %s 
@@ -21,7 +22,8 @@ class NodeStats(report.MultiGraphElement):
                 if cursor.rowcount > 0:
                     series = pd.DataFrame.from_dict(await cursor.fetchall())
                     series.columns = [
-                        'time', 'DB Pool', 'Waiting (Req)', 'Waiting (ms)', 'Worker Threads', 'Queue Length'
+                        'time', 'DB Pool', 'Waiting (Req)', 'Waiting (ms)', 'Worker Threads', 'Queue Length', 'Events',
+                        'Dropped', 'Event Latency (ms)', 'Pool Wait (ms)', 'Checkout (ms)', 'Saturated'
                     ]
                     series.plot(ax=self.axes[0], x='time', y=['DB Pool'], title='DB Pool Size', xticks=[], xlabel='')
                     self.axes[0].legend(loc='upper left')
@@ -30,17 +32,102 @@ class NodeStats(report.MultiGraphElement):
                     ax3 = self.axes[1].twinx()
                     series.plot(ax=ax3, x='time', y=['Waiting (ms)'], xticks=[], xlabel='', color='red')
                     ax3.legend(['Waiting (ms)'], loc='upper right')
-                    series.plot(ax=self.axes[2], x='time', y=['Worker Threads'], title='Worker Threads', xlabel='',
-                                ylabel='Threads')
+                    series.plot(ax=self.axes[2], x='time', y=['Worker Threads'], title='Worker Threads', xticks=[],
+                                xlabel='', ylabel='Threads')
                     self.axes[2].legend(loc='upper left')
                     bus = ServiceRegistry.get(ServiceBus)
                     self.axes[2].set_ylim(0, bus.executor._max_workers + 1)
                     ax4 = self.axes[2].twinx()
                     series.plot(ax=ax4, x='time', y=['Queue Length'], xlabel='', color='red')
                     ax4.legend(['Queue Length'], loc='upper right')
+                    series.plot(ax=self.axes[3], x='time', y=['Events', 'Dropped'], title='Events', xticks=[],
+                                xlabel='', ylabel='Events / min')
+                    self.axes[3].legend(loc='upper left')
+                    ax5 = self.axes[3].twinx()
+                    series.plot(ax=ax5, x='time', y=['Event Latency (ms)'], xlabel='', color='red')
+                    ax5.legend(['Event Latency (ms)'], loc='upper right')
+                    series.plot(ax=self.axes[4], x='time', y=['Pool Wait (ms)', 'Checkout (ms)'],
+                                title='DB Pool (p95)', xlabel='', ylabel='ms')
+                    self.axes[4].legend(loc='upper left')
+                    ax6 = self.axes[4].twinx()
+                    series.plot(ax=ax6, x='time', y=['Saturated'], xlabel='', color='red')
+                    ax6.legend(['Saturated'], loc='upper right')
                 else:
-                    for i in range(0, 2):
+                    for i in range(0, 5):
                         self.axes[i].bar([], [])
                         self.axes[i].set_xticks([])
                         self.axes[i].set_yticks([])
                         self.axes[i].text(0, 0, 'No data available.', ha='center', va='center', size=20)
+
+
+class QueueStats(report.EmbedElement):
+
+    async def render(self, node: str, period: str):
+        sql = """
+            SELECT server_name, SUM(events) AS events, SUM(events_dropped) AS dropped, 
+                   SUM(events_coalesced) AS coalesced, MAX(event_latency_max_ms) AS latency_max 
+            FROM queuestats 
+            WHERE time > ((NOW() AT TIME ZONE 'UTC') - ('1 ' || %s)::interval)
+            AND node = %s 
+            GROUP BY 1 ORDER BY 3 DESC, 2 DESC LIMIT 10
+        """
+        async with self.apool.connection() as conn:
+            async with conn.cursor(row_factory=dict_row) as cursor:
+                servers = events = dropped = ''
+                await cursor.execute(sql, (period, node))
+                async for row in cursor:
+                    servers += row['server_name'][:30] + '\n'
+                    events += '{:.0f}\n'.format(row['events'])
+                    dropped += '{:.0f} / {:.0f}\n'.format(row['dropped'], row['coalesced'])
+        if servers:
+            self.add_field(name='Server', value=servers)
+            self.add_field(name='Events', value=events)
+            self.add_field(name='Dropped / Coalesced', value=dropped)
+
+
+class BusStats(report.EmbedElement):
+
+    async def render(self, node: str, period: str, kind: str, title: str, unit: str = 'ms'):
+        sql = """
+            SELECT name, SUM(count) AS count, SUM(count * avg) / NULLIF(SUM(count), 0) AS avg, MAX(p95) AS p95, MAX(max) AS max, 
+                   SUM(timeouts) AS timeouts 
+            FROM busstats 
+            WHERE time > ((NOW() AT TIME ZONE 'UTC') - ('1 ' || %s)::interval)
+            AND node = %s AND kind = %s 
+            GROUP BY 1 ORDER BY SUM(count * avg) DESC, SUM(timeouts) DESC LIMIT 10
+        """
+        async with self.apool.connection() as conn:
+            async with conn.cursor(row_factory=dict_row) as cursor:
+                names = counts = values = ''
+                await cursor.execute(sql, (period, node, kind))
+                async for row in cursor:
+                    names += row['name'][:30] + '\n'
+                    counts += '{:.0f}'.format(row['count'])
+                    if row['timeouts']:
+                        counts += ' ({:.0f} timeouts)'.format(row['timeouts'])
+                    counts += '\n'
+                    values += '{:.0f} / {:.0f} / {:.0f}\n'.format(row['avg'] or 0, row['p95'] or 0, row['max'])
+        if names:
+            self.add_field(name=title, value=names)
+            self.add_field(name='Count', value=counts)
+            self.add_field(name=f'Avg / p95 / Max ({unit})', value=values)
+
+
+class ChannelStats(report.EmbedElement):
+
+    async def render(self, node: str, period: str):
+        sql = """
+            SELECT COALESCE(SUM(reconnects), 0) AS reconnects, COALESCE(SUM(messages_recovered), 0) AS recovered 
+            FROM nodestats 
+            WHERE time > ((NOW() AT TIME ZONE 'UTC') - ('1 ' || %s)::interval)
+            AND node = %s 
+        """
+        async with self.apool.connection() as conn:
+            async with conn.cursor(row_factory=dict_row) as cursor:
+                await cursor.execute(sql, (period, node))
+                row = await cursor.fetchone()
+        # only shown, if the database connection was lost
+        if row['reconnects']:
+            self.add_field(name='DB Reconnects', value='{:.0f}'.format(row['reconnects']))
+            self.add_field(name='Messages Recovered', value='{:.0f}'.format(row['recovered']))
+            self.add_field(name='_ _', value='_ _')
@@ -1 +1 @@
-__version__ = "3.2"
+__version__ = "3.5"
@@ -277,6 +277,22 @@ class MissionEventListener(EventListener):
         embed.set_footer(text="Players can be removed from the watchlist by using the /info command.")
         await self.bot.get_admin_channel(server).send(mentions, embed=embed)
 
+    @staticmethod
+    async def _load_player(server: Server, p: dict) -> Player:
+        player: Player = server.get_player(ucid=p['ucid'])
+        if not player:
+            player = DataObjectFactory().new(
+                Player, node=server.node, server=server, id=p['id'], name=p['name'], active=p['active'],
+                side=Side(p['side']), ucid=p['ucid'], slot=int(p['slot']), sub_slot=p['sub_slot'],
+                unit_callsign=p['unit_callsign'], unit_name=p['unit_name'], unit_type=p['unit_type'],
+                unit_display_name=p.get('unit_display_name', p['unit_type']), group_id=p['group_id'],
+                group_name=p['group_name'])
+            await player.load()
+            server.add_player(player)
+        else:
+            await player.update(p)
+        return player
+
     @event(name="registerDCSServer")
     async def registerDCSServer(self, server: Server, data: dict) -> None:
         if data['channel'].startswith('sync-'):
@@ -296,20 +312,9 @@ class MissionEventListener(EventListener):
         # all players are inactive for now
         for p in server.players.values():
             p.active = False
-        for p in data['players']:
-            if p['id'] == 1:
-                continue
-            player: Player = server.get_player(ucid=p['ucid'])
-            if not player:
-                player = DataObjectFactory().new(
-                    Player, node=server.node, server=server, id=p['id'], name=p['name'], active=p['active'],
-                    side=Side(p['side']), ucid=p['ucid'], slot=int(p['slot']), sub_slot=p['sub_slot'],
-                    unit_callsign=p['unit_callsign'], unit_name=p['unit_name'], unit_type=p['unit_type'],
-                    unit_display_name=p.get('unit_display_name', p['unit_type']), group_id=p['group_id'],
-                    group_name=p['group_name'])
-                server.add_player(player)
-            else:
-                player.update(p)
+        players = [p for p in data['players'] if p['id'] != 1]
+        # load all players in parallel, a mission restart brings in a lot of them at once
+        for p, player in zip(players, await asyncio.gather(*[self._load_player(server, p) for p in players])):
             if player.member:
                 autorole = server.locals.get('autorole', self.bot.locals.get('autorole', {}).get('online'))
                 if autorole:
@@ -398,9 +403,10 @@ class MissionEventListener(EventListener):
             player = DataObjectFactory().new(
                 Player, node=server.node, server=server, id=data['id'], name=data['name'],
                 active=data['active'], side=Side(data['side']), ucid=data['ucid'])
+            await player.load()
             server.add_player(player)
         else:
-            player.update(data)
+            await player.update(data)
         server.send_to_dcs({
             'command': 'uploadUserRoles',
             'ucid': player.ucid,
@@ -434,9 +440,10 @@ class MissionEventListener(EventListener):
             player = DataObjectFactory().new(
                 Player, node=server.node, server=server, id=data['id'], name=data['name'],
                 active=data['active'], side=Side(data['side']), ucid=data['ucid'])
+            await player.load()
             server.add_player(player)
         else:
-            player.update(data)
+            await player.update(data)
         # security check, if a banned player somehow managed to get here (should never happen)
         if player.is_banned():
             server.kick(player, self.node.config.get('messages', {}).get('player_banned', 'n/a'))
@@ -536,7 +543,7 @@ class MissionEventListener(EventListener):
                                     self.EVENT_TEXTS[Side.SPECTATOR]['spectators'].format(player.side.name,
                                                                                           data['name']))
         finally:
-            player.update(data)
+            await player.update(data)
             self.display_player_embed(server)
 
     @event(name="onGameEvent")
@@ -5,6 +5,7 @@ local Weather   = base.require('Weather')
 local dcsbot	= base.dcsbot
 local config	= base.require("DCSServerBotConfig")
 local utils 	= base.require("DCSServerBotUtils")
+local msgpack	= base.require("DCSServerBotMsgPack")
 
 local mod_dictionary= require('dictionary')
 
@@ -25,6 +26,8 @@ function dcsbot.registerDCSServer(json)
 	local msg = {}
 	msg.command = 'registerDCSServer'
 	msg.hook_version = config.VERSION
+	msg.wire_format = config.WIRE_FORMAT or 'json'
+	msg.wire_version = msgpack.VERSION
 	msg.dcs_version = Export.LoGetVersionInfo().ProductVersion[1] .. '.' .. Export.LoGetVersionInfo().ProductVersion[2] .. '.' .. Export.LoGetVersionInfo().ProductVersion[3] .. '.' .. Export.LoGetVersionInfo().ProductVersion[4]
     msg.host = config.DCS_HOST
 	msg.port = config.DCS_PORT
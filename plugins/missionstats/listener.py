@@ -1,7 +1,7 @@
 import asyncio
 
 from core import EventListener, Plugin, PersistentReport, Status, Server, Coalition, Channel, event, Report, \
-    get_translation
+    get_translation, utils
 from discord.ext import tasks
 
 _ = get_translation(__name__.split('.')[1])
@@ -39,6 +39,13 @@ class MissionStatisticsEventListener(EventListener):
 
     def __init__(self, plugin: Plugin):
         super().__init__(plugin)
+        utils.PreparedStatements.register('missionstats.insert', """
+            INSERT INTO missionstats (mission_id, event, init_id, init_side, init_type, init_cat, target_id, 
+                                      target_side, target_type, target_cat, weapon, place, comment) 
+            VALUES (%(mission_id)s, %(event)s, %(init_id)s, %(init_side)s, %(init_type)s, %(init_cat)s, 
+                    %(target_id)s, %(target_side)s, %(target_type)s, %(target_cat)s, %(weapon)s, %(place)s, 
+                    %(comment)s)
+        """)
         if not self.bot.mission_stats:
             self.bot.mission_stats = dict()
         self.update: dict[str, bool] = dict()
@@ -102,14 +109,7 @@ class MissionStatisticsEventListener(EventListener):
             }
             async with self.apool.connection() as conn:
                 async with conn.transaction():
-                    await conn.execute("""
-                        INSERT INTO missionstats (mission_id, event, init_id, init_side, init_type, init_cat, 
-                                                  target_id, target_side, target_type, target_cat, weapon, place, 
-                                                  comment) 
-                        VALUES (%(mission_id)s, %(event)s, %(init_id)s, %(init_side)s, %(init_type)s, %(init_cat)s, 
-                                %(target_id)s, %(target_side)s, %(target_type)s, %(target_cat)s, %(weapon)s, 
-                                %(place)s, %(comment)s)
-                    """, dataset)
+                    await utils.PreparedStatements.aexecute(conn, 'missionstats.insert', dataset)
 
     @event(name="onMissionEvent")
     async def onMissionEvent(self, server: Server, data: dict) -> None:
@@ -10,6 +10,11 @@ class ServerStatsListener(EventListener):
         super().__init__(plugin)
         self.fps = {}
         self.minutes = {}
+        utils.PreparedStatements.register('serverstats.insert', """
+            INSERT INTO serverstats (server_name, node, mission_id, users, status, cpu, mem_total, mem_ram, read_bytes, 
+                                     write_bytes, bytes_sent, bytes_recv, fps, ping) 
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """)
 
     @event(name="perfmon")
     async def perfmon(self, server: Server, data: dict):
@@ -51,10 +56,7 @@ class ServerStatsListener(EventListener):
 
         with self.pool.connection() as conn:
             with conn.transaction():
-                conn.execute("""
-                    INSERT INTO serverstats (server_name, node, mission_id, users, status, cpu, mem_total, 
-                                             mem_ram, read_bytes, write_bytes, bytes_sent, bytes_recv, fps, ping) 
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                """, (server.name, server.node.name, server.mission_id, len(server.get_active_players()),
-                      server.status.name, cpu, data['mem_total'], data['mem_ram'], data['read_bytes'],
-                      data['write_bytes'], data['bytes_sent'], data['bytes_recv'], fps, ping))
+                utils.PreparedStatements.execute(conn, 'serverstats.insert', (
+                    server.name, server.node.name, server.mission_id, len(server.get_active_players()),
+                    server.status.name, cpu, data['mem_total'], data['mem_ram'], data['read_bytes'],
+                    data['write_bytes'], data['bytes_sent'], data['bytes_recv'], fps, ping))
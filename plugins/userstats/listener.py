@@ -1,7 +1,7 @@
 import asyncio
 import psycopg
 
-from core import EventListener, Plugin, Status, Server, Side, Player, event, chat_command
+from core import EventListener, Plugin, Status, Server, Side, Player, event, chat_command, utils
 from psycopg import Connection
 from typing import Union
 
@@ -45,6 +45,8 @@ class UserStatisticsEventListener(EventListener):
     def __init__(self, plugin: Plugin):
         super().__init__(plugin)
         self.statistics = set()
+        for name, sql in self.SQL_EVENT_UPDATES.items():
+            utils.PreparedStatements.register(f'userstats.{name}', sql)
 
     async def processEvent(self, name: str, server: Server, data: dict) -> None:
         try:
@@ -233,7 +235,7 @@ class UserStatisticsEventListener(EventListener):
         if kill_type in self.SQL_EVENT_UPDATES.keys():
             pilot: Player = server.get_player(id=data['arg1'])
             for crew_member in server.get_crew_members(pilot):
-                conn.execute(self.SQL_EVENT_UPDATES[kill_type], (server.mission_id, crew_member.ucid))
+                utils.PreparedStatements.execute(conn, f'userstats.{kill_type}', (server.mission_id, crew_member.ucid))
 
     def _handle_kill_victim(self, conn: Connection, server: Server, data: dict) -> None:
         if data['arg1'] != -1:
@@ -261,7 +263,7 @@ class UserStatisticsEventListener(EventListener):
         if death_type in self.SQL_EVENT_UPDATES.keys():
             pilot: Player = server.get_player(id=data['arg4'])
             for crew_member in server.get_crew_members(pilot):
-                conn.execute(self.SQL_EVENT_UPDATES[death_type], (server.mission_id, crew_member.ucid))
+                utils.PreparedStatements.execute(conn, f'userstats.{death_type}', (server.mission_id, crew_member.ucid))
 
     def _handle_kill_event(self, conn: Connection, server: Server, data: dict) -> None:
         # Player is an AI => return
@@ -277,7 +279,8 @@ class UserStatisticsEventListener(EventListener):
                 player: Player = server.get_player(id=data['arg1'])
                 if not player:
                     return
-                conn.execute(self.SQL_EVENT_UPDATES[data['eventName']], (server.mission_id, player.ucid))
+                utils.PreparedStatements.execute(conn, f"userstats.{data['eventName']}",
+                                                 (server.mission_id, player.ucid))
 
     def _handle_eject_event(self, conn: Connection, server: Server, data: dict) -> None:
         if data['arg1'] != -1:
@@ -286,7 +289,8 @@ class UserStatisticsEventListener(EventListener):
                 pilot: Player = server.get_player(id=data['arg1'])
                 crew_members = server.get_crew_members(pilot)
                 if len(crew_members) == 1:
-                    conn.execute(self.SQL_EVENT_UPDATES[data['eventName']], (server.mission_id, crew_members[0].ucid))
+                    utils.PreparedStatements.execute(conn, f"userstats.{data['eventName']}",
+                                                     (server.mission_id, crew_members[0].ucid))
 
     @event(name="onGameEvent")
     async def onGameEvent(self, server: Server, data: dict) -> None:
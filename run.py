@@ -15,7 +15,7 @@ from pid import PidFile, PidFileError
 from rich import print
 from rich.console import Console
 
-from services import Dashboard
+from services import Dashboard, ServiceBus
 
 
 class Main:
@@ -102,6 +102,8 @@ class Main:
                                     self.log.info(f"  => {cls.__name__} NOT loaded.")
                     else:
                         self.log.info("Second Master found, stepping back to Agent configuration.")
+                        # the new master has to see the latest state of the players
+                        await registry.get(ServiceBus).player_writer.flush()
                         if self.node.config.get('use_dashboard', True):
                             await dashboard.stop()
                         for cls in registry.services().keys():
@@ -188,15 +188,72 @@ class MonitoringService(Service):
         bus = ServiceRegistry.get(ServiceBus)
         pstats: dict = self.apool.get_stats()
         wait_time = pstats.get('requests_wait_ms', 0) - last_wait_time
+        qstats: dict[str, dict] = {
+            server_name: queue.stats() for server_name, queue in bus.message_queue.items()
+        }
+        for server_name, stats in qstats.items():
+            if stats['dropped']:
+                self.log.warning(f"Server {server_name} can't keep up: {stats['dropped']} events dropped in the "
+                                 f"last minute.")
+        cstats: dict[str, dict] = bus.get_channel_stats(reset=True)
+        dbstats: dict[str, dict] = self.node.get_pool_stats()
+        for name, stats in dbstats.items():
+            if stats['saturated']:
+                self.log.warning(f"Database pool {name} saturated: {stats['saturated']} requests waited for a "
+                                 f"connection in the last minute (max size {stats['max_size']}).")
         async with self.apool.connection() as conn:
             async with conn.transaction():
                 await conn.execute("""
                     INSERT INTO nodestats (node, pool_size, pool_available, requests_waiting, requests_wait_ms, 
-                                           workers, qsize)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s)
+                                           workers, qsize, events, events_dropped, event_latency_ms, 
+                                           event_latency_max_ms, pool_wait_ms, pool_checkout_ms, pool_saturated,
+                                           reconnects, messages_recovered)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
                 """, (self.node.name, pstats.get('pool_size', 0), pstats.get('pool_available', 0),
                       pstats.get('requests_waiting', 0), wait_time, len(bus.executor._threads),
-                      sum(x.qsize() for x in bus.udp_server.message_queue.values())))
+                      sum(x['qsize'] for x in qstats.values()),
+                      sum(x['enqueued'] for x in qstats.values()),
+                      sum(x['dropped'] for x in qstats.values()),
+                      max((x['latency_avg_ms'] for x in qstats.values()), default=0),
+                      max((x['latency_max_ms'] for x in qstats.values()), default=0),
+                      int(dbstats['apool']['wait']['p95'] or 0),
+                      int(dbstats['apool']['checkout']['p95'] or 0),
+                      sum(x['saturated'] for x in dbstats.values()),
+                      sum(x['reconnects'] for x in cstats.values()),
+                      sum(x['recovered'] for x in cstats.values())))
+                # the same per DCS server, to see which one can't keep up
+                if qstats:
+                    async with conn.cursor() as cursor:
+                        await cursor.executemany("""
+                            INSERT INTO queuestats (node, server_name, qsize, events, events_dropped, events_coalesced, 
+                                                    event_latency_ms, event_latency_max_ms)
+                            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                        """, [
+                            (self.node.name, server_name, x['qsize'], x['enqueued'], x['dropped'], x['coalesced'],
+                             x['latency_avg_ms'], x['latency_max_ms'])
+                            for server_name, x in qstats.items()
+                        ])
+                # the statistics of the ServiceBus are reset every minute
+                busstats: dict[str, dict[str, dict]] = {
+                    "handler": bus.get_handler_stats(reset=True),
+                    "rpc": bus.get_rpc_stats(reset=True)
+                }
+                for channel, sizes in bus.get_message_stats(reset=True).items():
+                    busstats[f"message:{channel}"] = sizes
+                rows = [
+                    (self.node.name, kind, name, x['count'], x['avg'], x['p95'], x['max'], x.get('timeouts', 0))
+                    for kind, stats in busstats.items() for name, x in stats.items() if x['count'] or x.get('timeouts')
+                ]
+                if rows:
+                    async with conn.cursor() as cursor:
+                        await cursor.executemany("""
+                            INSERT INTO busstats (node, kind, name, count, avg, p95, max, timeouts)
+                            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                        """, rows)
+                for table in ['queuestats', 'busstats']:
+                    await conn.execute(f"""
+                        DELETE FROM {table} WHERE node = %s AND time < ((NOW() AT TIME ZONE 'utc') - interval '1 month')
+                    """, (self.node.name, ))
         last_wait_time = pstats.get('requests_wait_ms', 0)
 
     def _pull_load_params(self, server: Server):
@@ -0,0 +1,90 @@
+from __future__ import annotations
+import json
+import struct
+
+from typing import Optional
+
+# MessagePack is optional, we fall back to JSON if it is not available
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+__all__ = [
+    "WIRE_FORMAT_JSON",
+    "WIRE_FORMAT_MSGPACK",
+    "WIRE_VERSION",
+    "supported_formats",
+    "negotiate",
+    "encode",
+    "decode",
+    "is_fragment",
+    "parse_fragment"
+]
+
+WIRE_FORMAT_JSON = 'json'
+WIRE_FORMAT_MSGPACK = 'msgpack'
+
+# Binary frames start with a marker byte (JSON messages always start with "{"), followed by the wire version and
+# the frame type. The version has to match the one in Scripts/net/DCSServerBot/DCSServerBotMsgPack.lua.
+MARKER = 0x00
+WIRE_VERSION = 1
+TYPE_MSGPACK = 0x01
+TYPE_FRAGMENT = 0x02
+
+# Messages that do not fit into one datagram are split into fragments. Each fragment carries the message id, its
+# index and the total number of fragments after the frame header. Reassembled, they form a normal JSON or
+# MessagePack message.
+FRAGMENT_HEADER = struct.Struct('>BBBIHH')
+MAX_CHUNK_SIZE = 60000
+
+
+def supported_formats() -> list[str]:
+    if msgpack:
+        return [WIRE_FORMAT_MSGPACK, WIRE_FORMAT_JSON]
+    return [WIRE_FORMAT_JSON]
+
+
+def negotiate(wire_format: Optional[str], wire_version: Optional[int] = None) -> str:
+    """
+    Returns the wire format to be used for a DCS server, based on what the server announced on registration.
+    """
+    if wire_format in supported_formats() and (wire_format == WIRE_FORMAT_JSON or wire_version == WIRE_VERSION):
+        return wire_format
+    return WIRE_FORMAT_JSON
+
+
+def encode(message: dict, wire_format: str = WIRE_FORMAT_JSON) -> bytes:
+    if wire_format == WIRE_FORMAT_MSGPACK and msgpack:
+        return bytes([MARKER, WIRE_VERSION, TYPE_MSGPACK]) + msgpack.packb(message, use_bin_type=True)
+    return json.dumps(message).encode('utf-8')
+
+
+def decode(payload: bytes) -> dict:
+    if payload[0] != MARKER:
+        return json.loads(payload.strip())
+    if len(payload) < 3 or payload[1] != WIRE_VERSION:
+        raise ValueError(f"Unsupported wire version {payload[1] if len(payload) > 1 else None}")
+    if payload[2] == TYPE_MSGPACK:
+        if not msgpack:
+            raise ValueError("MessagePack message received, but msgpack is not installed")
+        return msgpack.unpackb(payload[3:], raw=False, strict_map_key=False)
+    raise ValueError(f"Unsupported frame type {payload[2]}")
+
+
+def is_fragment(payload: bytes) -> bool:
+    return len(payload) > 2 and payload[0] == MARKER and payload[2] == TYPE_FRAGMENT
+
+
+def parse_fragment(payload: bytes) -> tuple[int, int, int, bytes]:
+    """
+    Returns message id, index, total number of fragments and the chunk of a fragment.
+    """
+    if len(payload) < FRAGMENT_HEADER.size:
+        raise ValueError("Fragment too short")
+    _, version, _, msg_id, idx, total = FRAGMENT_HEADER.unpack_from(payload)
+    if version != WIRE_VERSION:
+        raise ValueError(f"Unsupported wire version {version}")
+    if not total or idx >= total:
+        raise ValueError(f"Invalid fragment {idx}/{total} of message {msg_id}")
+    return msg_id, idx, total, payload[FRAGMENT_HEADER.size:]
@@ -0,0 +1,226 @@
+from __future__ import annotations
+import asyncio
+import threading
+import time
+
+from collections import deque
+from enum import Enum
+from queue import Empty, Full
+from typing import Optional, Any
+
+__all__ = [
+    "EventQueue",
+    "OverflowPolicy",
+    "LOW_PRIORITY_EVENTS",
+    "STATUS_EVENTS",
+    "LATEST_WINS_EVENTS"
+]
+
+# events that can be dropped, if a server can't keep up
+LOW_PRIORITY_EVENTS = {'onMissionEvent', 'perfmon'}
+# events where only the latest one counts
+STATUS_EVENTS = {'getMissionUpdate', 'perfmon'}
+# events that replace an older queued event with the same command and key attributes
+LATEST_WINS_EVENTS: dict[str, list[str]] = {
+    'getMissionUpdate': [],
+    'onSRSUpdate': ['player_name']
+}
+
+
+class OverflowPolicy(Enum):
+    BLOCK = 'block'
+    DROP = 'drop'
+    COALESCE = 'coalesce'
+
+
+class EventQueue:
+    """
+    Queue of the events received from one DCS server. It can be used like a queue.Queue.
+
+    "Latest-wins" events replace an older event with the same key that is still waiting in the queue. The older event
+    is only marked as removed (tombstone), so the new event keeps its place behind all events received before it.
+
+    If a maximum size is set and the queue is full, the overflow policy decides what happens:
+    - block: the receiver waits until there is space again
+    - drop: a low-priority event gets dropped, the oldest queued one first
+    - coalesce: a status event replaces an older one of the same type, otherwise like "drop"
+    Events that can't be dropped or coalesced are always queued, even if that exceeds the maximum size.
+
+    Events can be consumed by a thread (get) or by a task on the event loop (get_async).
+    """
+
+    def __init__(self, maxsize: int = 0, policy: OverflowPolicy = OverflowPolicy.DROP,
+                 latest_wins: Optional[dict[str, list[str]]] = None):
+        self.maxsize = maxsize
+        self.policy = policy
+        self.latest_wins = latest_wins if latest_wins is not None else LATEST_WINS_EVENTS
+        # entries are [time queued, event, latest-wins key], the event is None if it has been removed
+        self.queue: deque[list] = deque()
+        # number of events in the queue, without tombstones
+        self.size = 0
+        # latest-wins key => queued entry
+        self.latest: dict[tuple, list] = {}
+        self.mutex = threading.Lock()
+        self.not_empty = threading.Condition(self.mutex)
+        self.not_full = threading.Condition(self.mutex)
+        self.all_tasks_done = threading.Condition(self.mutex)
+        self.unfinished_tasks = 0
+        # the consumer task waiting on the event loop, if any
+        self.waiter: Optional[asyncio.Future] = None
+        # statistics, reset on every call of stats()
+        self.enqueued = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.latency_sum = 0.0
+        self.latency_max = 0.0
+        self.dequeued = 0
+
+    def qsize(self) -> int:
+        with self.mutex:
+            return self.size
+
+    def empty(self) -> bool:
+        with self.mutex:
+            return not self.size
+
+    def full(self) -> bool:
+        with self.mutex:
+            return 0 < self.maxsize <= self.size
+
+    def _key(self, item: dict) -> Optional[tuple[Any, ...]]:
+        command = item.get('command')
+        if command not in self.latest_wins:
+            return None
+        return command, *(str(item.get(x)) for x in self.latest_wins[command])
+
+    def put(self, item: dict, block: bool = True, timeout: Optional[float] = None) -> None:
+        with self.not_full:
+            key = self._key(item) if item else None
+            if key and key in self.latest:
+                # an older version of this event is still waiting, it is outdated now
+                self._remove(self.latest[key])
+                self.coalesced += 1
+            elif 0 < self.maxsize <= self.size and item and not self._make_room(item):
+                if self.policy != OverflowPolicy.BLOCK:
+                    self.dropped += 1
+                    return
+                if not block or not self.not_full.wait_for(lambda: self.size < self.maxsize, timeout):
+                    self.dropped += 1
+                    raise Full
+            entry = [time.monotonic(), item, key]
+            self.queue.append(entry)
+            if key:
+                self.latest[key] = entry
+            self.size += 1
+            self.enqueued += 1
+            self.unfinished_tasks += 1
+            self.not_empty.notify()
+            if self.waiter:
+                self.waiter.get_loop().call_soon_threadsafe(self._wakeup, self.waiter)
+                self.waiter = None
+
+    def put_nowait(self, item: dict) -> None:
+        self.put(item, block=False)
+
+    def _make_room(self, item: dict) -> bool:
+        """
+        Frees up space for the given item according to the overflow policy.
+        Returns True, if the item can be queued, otherwise False.
+        """
+        command = item.get('command')
+        if self.policy == OverflowPolicy.COALESCE and command in STATUS_EVENTS:
+            for entry in self.queue:
+                if entry[1] and entry[1].get('command') == command:
+                    # the older event is outdated anyway
+                    self._remove(entry)
+                    self.coalesced += 1
+                    return True
+        if self.policy in [OverflowPolicy.DROP, OverflowPolicy.COALESCE]:
+            for entry in self.queue:
+                if entry[1] and entry[1].get('command') in LOW_PRIORITY_EVENTS:
+                    self._remove(entry)
+                    self.dropped += 1
+                    return True
+            # nothing to drop, low-priority events are rejected, everything else gets queued anyway
+            return command not in LOW_PRIORITY_EVENTS
+        return False
+
+    def _remove(self, entry: list) -> None:
+        # leave a tombstone, it will be skipped when it is reached
+        entry[1] = None
+        if entry[2] and self.latest.get(entry[2]) is entry:
+            del self.latest[entry[2]]
+        self.size -= 1
+        # a removed event will never be processed, so it is done already
+        self._discard()
+
+    def _discard(self) -> None:
+        self.unfinished_tasks -= 1
+        if not self.unfinished_tasks:
+            self.all_tasks_done.notify_all()
+
+    def get(self, block: bool = True, timeout: Optional[float] = None) -> dict:
+        with self.not_empty:
+            if not block and not self.size:
+                raise Empty
+            if not self.not_empty.wait_for(lambda: self.size, timeout):
+                raise Empty
+            return self._pop()
+
+    def get_nowait(self) -> dict:
+        return self.get(block=False)
+
+    async def get_async(self) -> dict:
+        while True:
+            with self.mutex:
+                if self.size:
+                    return self._pop()
+                self.waiter = waiter = asyncio.get_running_loop().create_future()
+            await waiter
+
+    @staticmethod
+    def _wakeup(waiter: asyncio.Future) -> None:
+        if not waiter.done():
+            waiter.set_result(None)
+
+    def _pop(self) -> dict:
+        entry = self.queue.popleft()
+        while entry[1] is None:
+            entry = self.queue.popleft()
+        created, item, key = entry
+        if key and self.latest.get(key) is entry:
+            del self.latest[key]
+        self.size -= 1
+        latency = time.monotonic() - created
+        self.latency_sum += latency
+        self.latency_max = max(self.latency_max, latency)
+        self.dequeued += 1
+        self.not_full.notify()
+        return item
+
+    def task_done(self) -> None:
+        with self.all_tasks_done:
+            if self.unfinished_tasks <= 0:
+                raise ValueError('task_done() called too many times')
+            self._discard()
+
+    def join(self) -> None:
+        with self.all_tasks_done:
+            self.all_tasks_done.wait_for(lambda: not self.unfinished_tasks)
+
+    def stats(self) -> dict:
+        """
+        Returns the statistics since the last call.
+        """
+        with self.mutex:
+            stats = {
+                "qsize": self.size,
+                "enqueued": self.enqueued,
+                "dropped": self.dropped,
+                "coalesced": self.coalesced,
+                "latency_avg_ms": int(self.latency_sum * 1000 / self.dequeued) if self.dequeued else 0,
+                "latency_max_ms": int(self.latency_max * 1000)
+            }
+            self.enqueued = self.dropped = self.coalesced = self.dequeued = 0
+            self.latency_sum = self.latency_max = 0.0
+            return stats
@@ -0,0 +1,101 @@
+from __future__ import annotations
+import logging
+import threading
+import time
+
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from . import codec
+
+__all__ = [
+    "Reassembler"
+]
+
+
+@dataclass
+class PendingMessage:
+    total: int
+    created: float = field(default_factory=time.monotonic)
+    chunks: dict[int, bytes] = field(default_factory=dict)
+    size: int = 0
+
+
+class Reassembler:
+    """
+    Collects the fragments of messages that were too large for one datagram and returns the message, as soon as all
+    fragments have been received.
+
+    Incomplete messages are dropped after a timeout. The number of messages that are reassembled in parallel, the size
+    of each message and the size of all buffered fragments together are limited, to not run out of memory if fragments
+    get lost. If a limit is reached, the oldest incomplete messages are dropped first.
+    """
+
+    def __init__(self, log: logging.Logger, timeout: float = 5.0, max_messages: int = 100,
+                 max_size: int = 16 * 1024 * 1024, max_total: int = 64 * 1024 * 1024):
+        self.log = log
+        self.timeout = timeout
+        self.max_messages = max_messages
+        self.max_size = min(max_size, max_total)
+        self.max_total = max_total
+        self.pending: dict[tuple[Any, int], PendingMessage] = {}
+        # size of all buffered fragments
+        self.buffered = 0
+        self.lock = threading.Lock()
+        # statistics
+        self.completed = 0
+        self.expired = 0
+        self.dropped = 0
+
+    def add(self, sender: Any, payload: bytes) -> Optional[bytes]:
+        """
+        Adds a fragment. Returns the complete message, if this was the last missing fragment, otherwise None.
+        """
+        msg_id, idx, total, chunk = codec.parse_fragment(payload)
+        key = (sender, msg_id)
+        with self.lock:
+            self._expire()
+            message = self.pending.get(key)
+            if not message or message.total != total:
+                # a new message (or a reused message id)
+                if total * codec.MAX_CHUNK_SIZE > self.max_size:
+                    self.dropped += 1
+                    raise ValueError(f"Message {msg_id} with {total} fragments exceeds the maximum size")
+                if message:
+                    self._discard(key)
+                if len(self.pending) >= self.max_messages:
+                    self._drop_oldest("Too many incomplete messages")
+                message = self.pending[key] = PendingMessage(total=total)
+            if idx in message.chunks:
+                return None
+            # make room for the fragment, the message it belongs to stays
+            while self.buffered + len(chunk) > self.max_total and len(self.pending) > 1:
+                self._drop_oldest("Reassembly buffers full", keep=key)
+            message.chunks[idx] = chunk
+            message.size += len(chunk)
+            self.buffered += len(chunk)
+            if len(message.chunks) < message.total:
+                return None
+            self._discard(key)
+            self.completed += 1
+        return b''.join(message.chunks[i] for i in range(message.total))
+
+    def _discard(self, key: tuple[Any, int]) -> PendingMessage:
+        message = self.pending.pop(key)
+        self.buffered -= message.size
+        return message
+
+    def _drop_oldest(self, reason: str, keep: Optional[tuple[Any, int]] = None) -> None:
+        oldest = next(x for x in self.pending if x != keep)
+        self._discard(oldest)
+        self.dropped += 1
+        self.log.warning(f"{reason}, dropping message {oldest[1]} from {oldest[0]}.")
+
+    def _expire(self) -> None:
+        now = time.monotonic()
+        for key, message in list(self.pending.items()):
+            if now - message.created > self.timeout:
+                self._discard(key)
+                self.expired += 1
+                self.log.warning(f"Message {key[1]} from {key[0]} timed out with {len(message.chunks)} of "
+                                 f"{message.total} fragments received.")
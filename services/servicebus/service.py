@@ -1,28 +1,37 @@
 from __future__ import annotations
 import asyncio
-import concurrent
+import concurrent.futures
 import inspect
 import json
+import logging
+import socket
+import time
 import uuid
 
 from _operator import attrgetter
 from concurrent.futures import ThreadPoolExecutor
 from contextlib import closing
 from copy import deepcopy
-from core import Server, Mission, Node, DataObjectFactory, Status, Autoexec, ServerProxy, utils, PubSub
+from core import Server, Mission, Node, DataObjectFactory, Status, Autoexec, ServerProxy, utils, PubSub, EventData
 from core.services.base import Service
 from core.services.registry import ServiceRegistry
 from core.data.impl.serverimpl import ServerImpl
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from enum import Enum
 from psycopg.rows import dict_row
-from psycopg.types.json import Json
-from queue import Queue
-from socketserver import BaseRequestHandler, ThreadingUDPServer
+from queue import Empty, Full
+from socketserver import BaseRequestHandler, UDPServer
 from typing import Callable, Optional, cast, Union, Any, TYPE_CHECKING
 
 from ..bot.service import BotService
 from ..bot.dcsserverbot import DCSServerBot
+from . import codec
+from .eventqueue import EventQueue, OverflowPolicy, LATEST_WINS_EVENTS
+from .fragments import Reassembler
+from .transport import NodeTransport
+from .udp import UDPSender
+from .writebehind import PlayerWriter
 
 __all__ = [
     "ServiceBus"
@@ -32,6 +41,14 @@ if TYPE_CHECKING:
     from core import EventListener
 
 
+@dataclass
+class RPCSpec:
+    getter: Callable[[object], Any]
+    is_coroutine: bool
+    convert_server: bool
+    convert_instance: bool
+
+
 @ServiceRegistry.register()
 class ServiceBus(Service):
 
@@ -41,19 +58,51 @@ class ServiceBus(Service):
         self.version = self.node.bot_version
         self.listeners: dict[str, asyncio.Future] = dict()
         self.eventListeners: list[EventListener] = []
+        # event name => listeners that subscribed to this event
+        self.routes: dict[str, list[EventListener]] = {}
+        # processing time per plugin and event
+        self.handler_stats: dict[str, utils.Histogram] = {}
+        self.budgets: dict[str, int] = self.locals.get('budgets', {})
+        # (type, method) => how to call it
+        self.rpc_cache: dict[tuple[type, str], RPCSpec] = {}
+        # outgoing sync requests per destination node and their statistics
+        self.inflight: dict[str, asyncio.Semaphore] = {}
+        self.rpc_stats: dict[str, utils.Histogram] = {}
+        self.rpc_timeouts: dict[str, int] = {}
+        # incoming sync requests that are being processed, by channel
+        self.running_rpcs: dict[str, asyncio.Task] = {}
         self.servers: dict[str, Server] = dict()
         self.udp_server = None
+        self.udp_transport: Optional[asyncio.DatagramTransport] = None
         self.executor = None
+        # threads: one reader thread and one consumer thread per DCS server, asyncio: everything runs on the event loop
+        self.ingest = self.locals.get('ingest', 'threads')
+        self.message_queue: dict[str, EventQueue] = {}
+        self.overflow = self.get_overflow_policy()
+        self.consumers: set[asyncio.Task] = set()
         if self.node.locals['DCS'].get('desanitize', True):
             if not self.node.locals['DCS'].get('cloud', False) or self.master:
                 utils.desanitize(self)
         self.loop = asyncio.get_event_loop()
+        self.udp_sender = UDPSender(self, coalesce=self.locals.get('coalesce', False))
+        # the wire format we offer to our DCS servers, they will confirm it on registration
+        self.wire_format = codec.negotiate(self.locals.get('wire_format'), codec.WIRE_VERSION)
+        # large messages from DCS arrive in fragments
+        self.reassembler = Reassembler(self.log, timeout=self.locals.get('reassembly_timeout', 5.0),
+                                       max_messages=self.locals.get('reassembly_buffers', 100),
+                                       max_total=self.locals.get('reassembly_memory', 64) * 1024 * 1024)
         # main.yaml database connection has priority for intercom
         url = self.node.config.get("database", self.node.locals.get('database'))['url']
         self.intercom_channel = PubSub(self.node, 'intercom', url)
         # nodes.yaml database connection has priority for broadcasts
         url = self.node.locals.get("database", self.node.config.get('database'))['url']
         self.broadcasts_channel = PubSub(self.node, 'broadcasts', url)
+        # optional direct connections between the nodes, the database is used as a fallback
+        self.node_transport: Optional[NodeTransport] = None
+        if self.locals.get('transport', {}).get('secret'):
+            self.node_transport = NodeTransport(self, self.locals['transport'])
+        # the players' name and last_seen are written in batches
+        self.player_writer = PlayerWriter(self.log, self.apool, self.locals.get('player_write_interval', 5.0))
 
     async def start(self):
         await super().start()
@@ -78,6 +127,9 @@ class ServiceBus(Service):
             asyncio.create_task(self.intercom_channel.subscribe(self.handle_rpc))
             # noinspection PyAsyncCall
             asyncio.create_task(self.broadcasts_channel.subscribe(self.handle_broadcast_event))
+            if self.node_transport:
+                await self.node_transport.start()
+            self.player_writer.start()
 
             await self.init_servers()
             if self.master:
@@ -101,17 +153,24 @@ class ServiceBus(Service):
             self.log.exception(ex)
 
     async def stop(self):
-        await self.broadcasts_channel.close()
-        await self.intercom_channel.close()
         if self.udp_server:
             self.log.debug("- Processing unprocessed messages ...")
             await asyncio.to_thread(self.udp_server.shutdown)
             self.log.debug("- All messages processed.")
             self.udp_server.server_close()
+        elif self.udp_transport:
+            self.udp_transport.close()
+            self.log.debug("- Processing unprocessed messages ...")
+            await asyncio.to_thread(self.drain_queues)
+            await asyncio.gather(*self.consumers, return_exceptions=True)
+            self.log.debug("- All messages processed.")
         self.log.debug('- Listener stopped.')
         if self.executor:
             self.executor.shutdown(wait=True)
             self.log.debug('- Executor stopped.')
+        self.udp_sender.close()
+        # the remaining events might have updated players
+        await self.player_writer.stop()
         if not self.master:
             self.send_to_node({
                 "command": "rpc",
@@ -121,12 +180,22 @@ class ServiceBus(Service):
                     "node": self.node.name
                 }
             })
+        # the channels are closed last, so everything sent above is written to the database before we go
+        if self.node_transport:
+            await self.node_transport.stop()
+        await self.broadcasts_channel.close()
+        await self.intercom_channel.close()
         await super().stop()
 
     @property
     def master(self) -> bool:
         return self.node.master
 
+    @property
+    def event_timeout(self) -> float:
+        # time every plugin has to process an event
+        return 120.0 if self.node.locals.get('slow_system', False) else 60.0
+
     @property
     def filter(self) -> dict:
         return {
@@ -137,11 +206,27 @@ class ServiceBus(Service):
     def register_eventListener(self, listener: EventListener):
         self.log.debug(f'  - Registering EventListener {type(listener).__name__}')
         self.eventListeners.append(listener)
+        self.build_routes()
 
     def unregister_eventListener(self, listener: EventListener):
         self.eventListeners.remove(listener)
+        self.build_routes()
         self.log.debug(f'  - EventListener {type(listener).__name__} unregistered.')
 
+    def build_routes(self):
+        routes: dict[str, list[EventListener]] = {}
+        for listener in self.eventListeners:
+            for name in listener.__events__.keys():
+                routes.setdefault(name, []).append(listener)
+        # replace the whole table at once, as it is read by the UDP listener threads
+        self.routes = routes
+        # plugins might have been reloaded
+        self.rpc_cache.clear()
+
+    def has_subscribers(self, command: str) -> bool:
+        # registerDCSServer is always needed to register the server itself
+        return command == 'registerDCSServer' or command in self.routes
+
     async def init_servers(self):
         async with self.apool.connection() as conn:
             for instance in self.node.instances:
@@ -249,6 +334,7 @@ class ServiceBus(Service):
         if not server.process:
             server.process = utils.find_process("DCS_server.exe|DCS.exe", server.instance.name)
         server.dcs_version = data['dcs_version']
+        server.wire_format = codec.negotiate(data.get('wire_format'), data.get('wire_version'))
         # if we are an agent, initialize the server
         if not self.master:
             if 'current_mission' in data:
@@ -305,14 +391,27 @@ class ServiceBus(Service):
         self.log.info(f'  => Local DCS-Server "{server_name}" registered.')
         return True
 
+    def get_overflow_policy(self) -> OverflowPolicy:
+        overflow = self.locals.get('overflow', OverflowPolicy.DROP.value)
+        try:
+            return OverflowPolicy(overflow)
+        except ValueError:
+            self.log.warning(f"Invalid overflow policy \"{overflow}\" in servicebus.yaml, using "
+                             f"\"{OverflowPolicy.DROP.value}\" instead.")
+            return OverflowPolicy.DROP
+
+    def create_event_queue(self) -> EventQueue:
+        return EventQueue(maxsize=self.locals.get('max_queue_size', 0),
+                          policy=self.overflow,
+                          latest_wins=LATEST_WINS_EVENTS | self.locals.get('latest_wins', {}))
+
     def rename_server(self, server: Server, new_name: str):
         self.servers[new_name] = server
         if server.name in self.servers:
             del self.servers[server.name]
-        if server.name in self.udp_server.message_queue:
-            self.udp_server.message_queue[server.name].put({})
-            self.udp_server.message_queue[new_name] = Queue()
-            self.executor.submit(self.udp_server.process, new_name)
+        if server.name in self.message_queue:
+            self.message_queue[server.name].put({})
+            self.start_consumer(new_name)
 
     async def ban(self, ucid: str, banned_by: str, reason: str = 'n/a', days: Optional[int] = None):
         if days:
@@ -401,9 +500,8 @@ class ServiceBus(Service):
                 if not server.locals.get('channels'):
                     server.locals['channels'] = channels
                 # add eventlistener queue
-                if server.name not in self.udp_server.message_queue:
-                    self.udp_server.message_queue[server.name] = Queue()
-                    self.executor.submit(self.udp_server.process, server.name)
+                if server.name not in self.message_queue:
+                    self.start_consumer(server.name)
                 self.log.info(f"  => DCS-Server \"{server.name}\" from Node {server.node.name} registered.")
             else:
                 # IP might have changed, so update it
@@ -418,50 +516,116 @@ class ServiceBus(Service):
         if self.master:
             if node and node != self.node.name:
                 self.log.debug('MASTER->{}: {}'.format(node, json.dumps(data)))
-                with self.pool.connection() as conn:
-                    with conn.transaction():
-                        if data.get('command', '') == 'rpc':
-                            self.intercom_channel.publish(conn, {
-                                'guild_id': self.node.guild_id, 'node': node, 'data': Json(data)
-                            })
-                        else:
-                            self.broadcasts_channel.publish(conn, {
-                                'guild_id': self.node.guild_id, 'node': node, 'data': Json(data)
-                            })
+                self.publish(node, data)
             elif data.get('command', '') != 'rpc':
                 server_name = data['server_name']
-                if server_name not in self.udp_server.message_queue:
+                if server_name not in self.message_queue:
                     self.log.debug(f"Message received for unregistered server {server_name}, ignoring.")
                 else:
                     self.log.debug('{}->HOST: {}'.format(server_name, json.dumps(data)))
-                    self.udp_server.message_queue[server_name].put(data)
+                    self.enqueue_event(server_name, data)
             else:
                 asyncio.create_task(self.handle_rpc(data))
         else:
             data['node'] = self.node.name
-            with self.pool.connection() as conn:
-                with conn.transaction():
-                    if data.get('command', '') == 'rpc':
-                        self.intercom_channel.publish(conn, {
-                            'guild_id': self.node.guild_id, 'node': 'Master', 'data': Json(data)
-                        })
-                    else:
-                        self.broadcasts_channel.publish(conn, {
-                            'guild_id': self.node.guild_id, 'node': 'Master', 'data': Json(data)
-                        })
+            self.publish('Master', data)
             self.log.debug(f"{self.node.name}->MASTER: {json.dumps(data)}")
 
+    def publish(self, node: str, data: dict):
+        channel = 'intercom' if data.get('command', '') == 'rpc' else 'broadcasts'
+        if self.node_transport:
+            self.node_transport.publish(node, channel, data)
+        else:
+            getattr(self, f"{channel}_channel").publish(node, data)
+
+    async def send_to_all_nodes(self, data: dict, nodes: Optional[list[str]] = None) -> list[str]:
+        """
+        Sends a message to all other active nodes (or the given ones). The message is stored only once in the
+        database and every node acknowledges it, instead of storing a copy per node.
+        Returns the names of the nodes the message was sent to.
+        """
+        if nodes is None:
+            nodes = await self.node.get_active_nodes()
+        nodes = [x for x in nodes if x != self.node.name]
+        if not nodes:
+            return []
+        if not self.master:
+            data['node'] = self.node.name
+        self.log.debug('{}->ALL: {}'.format(self.node.name, json.dumps(data)))
+        if len(nodes) == 1:
+            self.publish(nodes[0], data)
+            return nodes
+        channel = 'intercom' if data.get('command', '') == 'rpc' else 'broadcasts'
+        if self.node_transport:
+            for node in nodes:
+                self.node_transport.publish(node, channel, data)
+        else:
+            getattr(self, f"{channel}_channel").publish_all(nodes, data)
+        return nodes
+
     async def send_to_node_sync(self, message: dict, timeout: Optional[int] = 30.0, *,
                                 node: Optional[Union[Node, str]] = None):
+        destination = (node.name if isinstance(node, Node) else node) or 'Master'
+        method = message.get('method', message.get('command'))
+        if destination not in self.inflight:
+            self.inflight[destination] = asyncio.Semaphore(self.locals.get('max_inflight', 50))
+        start = time.perf_counter()
+        deadline = self.loop.time() + timeout if timeout else None
+        # limit the number of requests that wait for the same node, waiting for a slot counts against the timeout
+        try:
+            await asyncio.wait_for(self.inflight[destination].acquire(), timeout)
+        except asyncio.TimeoutError:
+            self.rpc_timeouts[method] = self.rpc_timeouts.get(method, 0) + 1
+            self.log.warning(f"Too many requests pending for node {destination}, {method} timed out.")
+            raise
         future = self.loop.create_future()
         token = 'sync-' + str(uuid.uuid4())
         message['channel'] = token
         self.listeners[token] = future
         try:
             self.send_to_node(message, node=node)
-            return await asyncio.wait_for(future, timeout)
+            return await asyncio.wait_for(future, deadline - self.loop.time() if deadline else None)
+        except asyncio.TimeoutError:
+            self.rpc_timeouts[method] = self.rpc_timeouts.get(method, 0) + 1
+            raise
         finally:
             del self.listeners[token]
+            self.inflight[destination].release()
+            if (future.cancelled() or not future.done()) and message.get('command') == 'rpc':
+                # we don't wait anymore, so the other node can stop working on it
+                self.send_to_node({
+                    "command": "rpc",
+                    "service": self.__class__.__name__,
+                    "method": "cancel_rpc",
+                    "params": {
+                        "channel": token
+                    }
+                }, node=node)
+            if method not in self.rpc_stats:
+                self.rpc_stats[method] = utils.Histogram()
+            self.rpc_stats[method].observe((time.perf_counter() - start) * 1000)
+
+    def cancel_rpc(self, channel: str) -> None:
+        task = self.running_rpcs.get(channel)
+        if task:
+            self.log.debug(f"RPC {channel} cancelled by the caller.")
+            task.cancel()
+
+    def get_rpc_stats(self, reset: bool = False) -> dict[str, dict]:
+        """
+        Returns the latency statistics (in ms) and the number of timeouts of the RPCs this node sent, per method.
+        """
+        # requests that timed out waiting for a free slot have no latency
+        for method in self.rpc_timeouts.keys() - self.rpc_stats.keys():
+            self.rpc_stats[method] = utils.Histogram()
+        stats = {
+            method: value.to_dict() | {"timeouts": self.rpc_timeouts.get(method, 0)}
+            for method, value in sorted(self.rpc_stats.items(), key=lambda x: x[1].sum, reverse=True)
+        }
+        if reset:
+            self.rpc_stats.clear()
+            self.rpc_timeouts.clear()
+        return stats
 
     async def handle_rpc(self, data: dict):
         # handle synchronous responses
@@ -496,6 +660,10 @@ class ServiceBus(Service):
         if not obj:
             self.log.debug('RPC command received for unknown object/service.')
             return
+        channel = data.get('channel', '')
+        if channel.startswith('sync-'):
+            # the caller might cancel this request (see cancel_rpc)
+            self.running_rpcs[channel] = asyncio.current_task()
         try:
             rc = await self.rpc(obj, data)
             if data.get('channel', '').startswith('sync-'):
@@ -505,6 +673,8 @@ class ServiceBus(Service):
                     "command": "rpc",
                     "method": data['method'],
                     "channel": data['channel'],
+                    # the answer goes through the same lane as the request
+                    "priority": data.get('priority', 'control'),
                     "return": rc if rc is not None else ''
                 }, node=data.get('node'))
         except Exception as ex:
@@ -515,6 +685,7 @@ class ServiceBus(Service):
                     "command": "rpc",
                     "method": data['method'],
                     "channel": data['channel'],
+                    "priority": data.get('priority', 'control'),
                     "return": '',
                     "exception": {
                         "class": f"{ex.__class__.__module__}.{ex.__class__.__name__}",
@@ -524,6 +695,8 @@ class ServiceBus(Service):
                 }, node=data.get('node'))
             else:
                 self.log.exception(ex)
+        finally:
+            self.running_rpcs.pop(channel, None)
 
     async def handle_broadcast_event(self, data: dict) -> None:
         if self.master:
@@ -538,7 +711,7 @@ class ServiceBus(Service):
             return
         self.log.debug(f"{data['node']}->MASTER: {json.dumps(data)}")
         server_name = data['server_name']
-        if server_name not in self.udp_server.message_queue:
+        if server_name not in self.message_queue:
             self.log.debug(f"Intercom: message ignored, no server {server_name} registered.")
             return
         # support sync responses though intercom
@@ -552,7 +725,9 @@ class ServiceBus(Service):
                 self.loop.call_soon_threadsafe(f.set_result, data)
             if data['command'] not in ['registerDCSServer', 'getMissionUpdate']:
                 return
-        self.udp_server.message_queue[server_name].put(data)
+        if not self.has_subscribers(data['command']):
+            return
+        self.enqueue_event(server_name, data)
 
     async def handle_agent(self, data: dict):
         self.log.debug(f"MASTER->{self.node.name}: {json.dumps(data)}")
@@ -564,24 +739,40 @@ class ServiceBus(Service):
             server: Server = self.servers[server_name]
             server.send_to_dcs(data)
 
+    def get_rpc_spec(self, obj: object, method: str) -> RPCSpec:
+        key = (type(obj), method)
+        spec = self.rpc_cache.get(key)
+        if not spec:
+            getter = attrgetter(method)
+            func = getter(obj)
+            parameters = inspect.signature(func).parameters if func else {}
+            spec = RPCSpec(
+                getter=getter,
+                is_coroutine=asyncio.iscoroutinefunction(func),
+                convert_server='server' in parameters and parameters['server'].annotation != 'str',
+                convert_instance='instance' in parameters and parameters['instance'].annotation != 'str'
+            )
+            self.rpc_cache[key] = spec
+        return spec
+
     async def rpc(self, obj: object, data: dict) -> Optional[dict]:
         if 'method' in data:
-            func = attrgetter(data.get('method'))(obj)
+            spec = self.get_rpc_spec(obj, data['method'])
+            func = spec.getter(obj)
             if not func:
                 return
             kwargs = deepcopy(data.get('params', {}))
-            parameters = inspect.signature(func).parameters
             # servers will be passed by name
-            if kwargs.get('server') and parameters.get('server').annotation != 'str':
+            if kwargs.get('server') and spec.convert_server:
                 kwargs['server'] = self.servers.get(kwargs['server'])
-            if kwargs.get('instance') and parameters.get('instance').annotation != 'str':
+            if kwargs.get('instance') and spec.convert_instance:
                 kwargs['instance'] = next(x for x in self.node.instances if x.name == kwargs['instance'])
             if self.master:
                 if kwargs.get('member'):
                     kwargs['member'] = self.bot.guilds[0].get_member(int(kwargs['member'][2:-1]))
                 if kwargs.get('user') and kwargs['user'].startswith('<@'):
                     kwargs['user'] = self.bot.guilds[0].get_member(int(kwargs['user'][2:-1]))
-            if asyncio.iscoroutinefunction(func):
+            if spec.is_coroutine:
                 rc = await func(**kwargs) if kwargs else await func()
             else:
                 rc = func(**kwargs) if kwargs else func()
@@ -591,120 +782,314 @@ class ServiceBus(Service):
                 setattr(obj, key, value)
 
     async def propagate_event(self, command: str, data: dict, server: Optional[Server] = None):
+        listeners = self.routes.get(command)
+        if not listeners:
+            return
         tasks = [
-            asyncio.create_task(listener.processEvent(command, server, deepcopy(data)))
-            for listener in self.eventListeners
-            if listener.has_event(command)
+            asyncio.create_task(listener.processEvent(command, server, EventData(data)))
+            for listener in listeners
         ]
         await asyncio.gather(*tasks, return_exceptions=True)
 
-    async def start_udp_listener(self):
-        class RequestHandler(BaseRequestHandler):
+    def forward_event(self, server: Server, data: dict) -> bool:
+        command = data['command']
+        if command == 'registerDCSServer':
+            if not server.is_remote:
+                if not self.register_server(data):
+                    self.log.error(f"Error while registering server {server.name}.")
+                    return False
+                self.log.debug(f"Registering server {server.name} on Master node ...")
+        elif server.status == Status.UNREGISTERED:
+            self.log.debug(f"Command {command} received for unregistered server {server.name}, ignoring.")
+            return True
+        self.send_to_node(data)
+        return True
 
-            def handle(derived):
-                if not derived.request or not derived.request[0]:
-                    self.log.warning(f"Empty request received on port {self.node.listen_port} - ignoring.")
-                    return
-                data: dict = json.loads(derived.request[0].strip())
-                # ignore messages not containing server names
-                if 'server_name' not in data:
-                    self.log.warning('Message without server_name received: {}'.format(data))
+    async def dispatch_batch(self, server: Server, batch: list[dict]) -> bool:
+        for data in batch:
+            try:
+                if not await self.dispatch_event(server, data):
+                    return False
+            except Exception as ex:
+                self.log.exception(ex)
+        return True
+
+    async def dispatch_event(self, server: Server, data: dict) -> bool:
+        command = data['command']
+        if command == 'registerDCSServer':
+            if not server.is_remote:
+                # register_server() does blocking database calls, keep them away from the loop
+                if not await asyncio.to_thread(self.register_server, data):
+                    self.log.error(f"Error while registering server {server.name}.")
+                    return False
+        elif server.status == Status.UNREGISTERED:
+            self.log.debug(f"Command {command} received for unregistered server {server.name}, ignoring.")
+            return True
+        listeners = self.routes.get(command)
+        if not listeners:
+            return True
+        timeout = self.event_timeout
+        await asyncio.gather(*[
+            self.process_event(listener, command, server, EventData(data),
+                               timeout=timeout if command != 'registerDCSServer' else None)
+            for listener in listeners
+        ])
+        return True
+
+    async def process_event(self, listener: EventListener, command: str, server: Server, data: dict,
+                            timeout: Optional[float] = None) -> None:
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(listener.processEvent(command, server, data), timeout=timeout)
+        except asyncio.TimeoutError:
+            self.log.warning(f"Plugin {listener.plugin_name} did not process {command} on server {server.name} "
+                             f"within {timeout:.0f} seconds, cancelled.")
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            key = f"{listener.plugin_name}:{command}"
+            if key not in self.handler_stats:
+                self.handler_stats[key] = utils.Histogram()
+            self.handler_stats[key].observe(elapsed)
+            budget = self.budgets.get(command, self.budgets.get('default', 1000))
+            if elapsed > budget:
+                self.log.warning(f"Plugin {listener.plugin_name} took {elapsed:.0f} ms to process {command} on "
+                                 f"server {server.name} (budget: {budget} ms).")
+
+    def get_message_stats(self, reset: bool = False) -> dict[str, dict]:
+        """
+        Returns the size statistics (in bytes) of the messages sent to other nodes through the database.
+        """
+        return {
+            "intercom": self.intercom_channel.get_size_stats(reset),
+            "broadcasts": self.broadcasts_channel.get_size_stats(reset)
+        }
+
+    def get_channel_stats(self, reset: bool = False) -> dict[str, dict]:
+        """
+        Returns the reconnects of the intercom and broadcasts listeners and the messages recovered after them.
+        """
+        return {
+            "intercom": self.intercom_channel.get_connection_stats(reset),
+            "broadcasts": self.broadcasts_channel.get_connection_stats(reset)
+        }
+
+    def get_handler_stats(self, reset: bool = False) -> dict[str, dict]:
+        """
+        Returns the latency statistics (in ms) per plugin and event, slowest first.
+        """
+        stats = {
+            key: value.to_dict()
+            for key, value in sorted(self.handler_stats.items(), key=lambda x: x[1].sum, reverse=True)
+        }
+        if reset:
+            self.handler_stats.clear()
+        return stats
+
+    def handle_datagram(self, payload: bytes, address: tuple[str, int], block: bool = False) -> None:
+        if not payload:
+            self.log.warning(f"Empty request received on port {self.node.listen_port} - ignoring.")
+            return
+        try:
+            if codec.is_fragment(payload):
+                payload = self.reassembler.add(address, payload)
+                if not payload:
                     return
-                server_name = data['server_name']
-                self.log.debug('{}->HOST: {}'.format(server_name, json.dumps(data)))
-                server = self.servers.get(server_name)
-                if not server:
-                    self.log.debug(
-                        f"Command {data['command']} received for unregistered server {server_name}, ignoring.")
+            data: dict = codec.decode(payload)
+        except ValueError as ex:
+            self.log.warning(f"Invalid message received on port {self.node.listen_port}: {ex}")
+            return
+        # ignore messages not containing server names
+        if 'server_name' not in data:
+            self.log.warning('Message without server_name received: {}'.format(data))
+            return
+        server_name = data['server_name']
+        if self.log.isEnabledFor(logging.DEBUG):
+            self.log.debug('{}->HOST: {}'.format(server_name, json.dumps(data)))
+        server = self.servers.get(server_name)
+        if not server:
+            self.log.debug(
+                f"Command {data['command']} received for unregistered server {server_name}, ignoring.")
+            return
+        server.last_seen = datetime.now(timezone.utc)
+        if 'channel' in data and data['channel'].startswith('sync-'):
+            if data['channel'] in server.listeners:
+                f = server.listeners.get(data['channel'])
+                if f and not f.done():
+                    self.loop.call_soon_threadsafe(f.set_result, data)
+                if data['command'] not in ['registerDCSServer', 'getMissionUpdate']:
                     return
-                server.last_seen = datetime.now(timezone.utc)
-                if 'channel' in data and data['channel'].startswith('sync-'):
-                    if data['channel'] in server.listeners:
-                        f = server.listeners.get(data['channel'])
-                        if f and not f.done():
-                            self.loop.call_soon_threadsafe(f.set_result, data)
-                        if data['command'] not in ['registerDCSServer', 'getMissionUpdate']:
-                            return
-                udp_server: MyThreadingUDPServer = cast(MyThreadingUDPServer, derived.server)
-                if server.name not in udp_server.message_queue:
-                    udp_server.message_queue[server.name] = Queue()
-                    self.executor.submit(udp_server.process, server.name)
-                udp_server.message_queue[server.name].put(data)
+        # the master drops events nobody listens to, agents forward everything
+        if self.master and not self.has_subscribers(data['command']):
+            return
+        if server.name not in self.message_queue:
+            self.start_consumer(server.name)
+        self.enqueue_event(server.name, data, block=block)
 
-        class MyThreadingUDPServer(ThreadingUDPServer):
-            def __init__(derived, server_address: tuple[str, int], request_handler: Callable[..., BaseRequestHandler]):
+    def enqueue_event(self, server_name: str, data: dict, block: bool = False) -> None:
+        # only the threads of the UDP listener are allowed to block, never the event loop
+        try:
+            self.message_queue[server_name].put(data, block=block)
+        except Full:
+            self.log.debug(f"Queue of server {server_name} is full, {data['command']} dropped.")
+
+    def start_consumer(self, server_name: str) -> None:
+        self.message_queue[server_name] = self.create_event_queue()
+        if self.ingest == 'asyncio':
+            # we might be called from a worker thread (see register_server)
+            self.loop.call_soon_threadsafe(self._create_consumer_task, server_name)
+        else:
+            self.executor.submit(self.process, server_name)
+
+    def _create_consumer_task(self, server_name: str) -> None:
+        self.consumers = {x for x in self.consumers if not x.done()}
+        self.consumers.add(self.loop.create_task(self.consume(server_name)))
+
+    def process(self, server_name: str):
+        batch_size = self.locals.get('batch_size', 100)
+        try:
+            queue = self.message_queue[server_name]
+            while True:
+                # block for the first event, then drain everything that is already waiting
+                batch: list[dict] = [queue.get()]
+                while batch[-1] and len(batch) < batch_size:
+                    try:
+                        batch.append(queue.get_nowait())
+                    except Empty:
+                        break
                 try:
-                    # enable reuse, in case the restart was too fast and the port was still in TIME_WAIT
-                    MyThreadingUDPServer.allow_reuse_address = True
-                    MyThreadingUDPServer.max_packet_size = 65504
-                    derived.message_queue: dict[str, Queue[dict]] = {}
-                    super().__init__(server_address, request_handler)
+                    server: Server = self.servers.get(server_name)
+                    if not server:
+                        return
+                    events = [x for x in batch if x]
+                    if self.master:
+                        # hand the whole batch over to the event loop in one go
+                        if events and not self.wait_for_dispatch(server, events):
+                            return
+                    else:
+                        for data in events:
+                            if not self.forward_event(server, data):
+                                return
+                    # an empty message stops the listener
+                    if not batch[-1]:
+                        return
                 except Exception as ex:
                     self.log.exception(ex)
+                finally:
+                    for _ in batch:
+                        queue.task_done()
+        finally:
+            self.log.debug(f"Listener for server {server_name} stopped.")
+            del self.message_queue[server_name]
+
+    def wait_for_dispatch(self, server: Server, events: list[dict]) -> bool:
+        future = asyncio.run_coroutine_threadsafe(self.dispatch_batch(server, events), self.loop)
+        # every listener is cancelled after the event timeout already, so only a listener that does not react to
+        # the cancellation can get us here, it must not stop the processing of this server for good
+        timeout = 2 * self.event_timeout
+        try:
+            return future.result(timeout=timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            self.log.warning(f"{len(events)} events of server {server.name} were not processed within {timeout:.0f} "
+                             f"seconds, giving up on them. Check the plugin warnings above.")
+            return True
 
-            def process(derived, server_name: str):
+    async def consume(self, server_name: str):
+        batch_size = self.locals.get('batch_size', 100)
+        try:
+            queue = self.message_queue[server_name]
+            while True:
+                # wait for the first event, then drain everything that is already waiting
+                batch: list[dict] = [await queue.get_async()]
+                while batch[-1] and len(batch) < batch_size:
+                    try:
+                        batch.append(queue.get_nowait())
+                    except Empty:
+                        break
                 try:
-                    timeout = 120.0 if self.node.locals.get('slow_system', False) else 60.0
-                    data: dict = derived.message_queue[server_name].get()
-                    while data:
-                        server: Server = self.servers.get(server_name)
-                        if not server:
+                    server: Server = self.servers.get(server_name)
+                    if not server:
+                        return
+                    events = [x for x in batch if x]
+                    if self.master:
+                        if events and not await self.dispatch_batch(server, events):
                             return
-                        try:
-                            command = data['command']
-                            if command == 'registerDCSServer':
-                                if not server.is_remote:
-                                    if not self.register_server(data):
-                                        self.log.error(f"Error while registering server {server.name}.")
-                                        return
-                                    if not self.master:
-                                        self.log.debug(f"Registering server {server.name} on Master node ...")
-                            elif server.status == Status.UNREGISTERED:
-                                self.log.debug(
-                                    f"Command {command} received for unregistered server {server.name}, ignoring.")
-                                continue
-                            if self.master:
-                                futures = [
-                                    asyncio.run_coroutine_threadsafe(
-                                        listener.processEvent(command, server, deepcopy(data)), self.loop
-                                    )
-                                    for listener in self.eventListeners
-                                    if listener.has_event(command)
-                                ]
-                                done, not_done = concurrent.futures.wait(
-                                    futures, timeout=timeout if command != 'registerDCSServer' else None)
-
-                                if not_done:
-                                    # Logging the commands that could not be processed due to timeout
-                                    self.log.warning(f"Command {data} was not processed due to a timeout.")
-                                    listeners = [x for x in self.eventListeners if x.has_event(command)]
-                                    for future in not_done:
-                                        pos = futures.index(future)
-                                        self.log.debug(f"Not processed: {listeners[pos].plugin_name}")
-                                        future.cancel()
-                            else:
-                                self.send_to_node(data)
-                        except Exception as ex:
-                            self.log.exception(ex)
-                        finally:
-                            derived.message_queue[server.name].task_done()
-                            data = derived.message_queue[server.name].get()
+                    elif events:
+                        # forwarding does blocking database calls
+                        if not await asyncio.to_thread(
+                                lambda: all(self.forward_event(server, data) for data in events)):
+                            return
+                    # an empty message stops the listener
+                    if not batch[-1]:
+                        return
+                except Exception as ex:
+                    self.log.exception(ex)
                 finally:
-                    self.log.debug(f"Listener for server {server_name} stopped.")
-                    del derived.message_queue[server_name]
+                    for _ in batch:
+                        queue.task_done()
+        finally:
+            self.log.debug(f"Listener for server {server_name} stopped.")
+            del self.message_queue[server_name]
 
-            def shutdown(derived):
-                super().shutdown()
+    def drain_queues(self):
+        for server_name, queue in list(self.message_queue.items()):
+            try:
+                if not queue.empty():
+                    queue.join()
+                queue.put({})
+            except Exception as ex:
+                self.log.exception(ex)
+
+    async def start_udp_listener(self):
+        host = self.node.listen_address
+        port = self.node.listen_port
+        if self.ingest == 'asyncio':
+            await self.start_datagram_endpoint(host, port)
+        else:
+            self.start_threading_udp_server(host, port)
+
+    async def start_datagram_endpoint(self, host: str, port: int):
+        class DCSProtocol(asyncio.DatagramProtocol):
+
+            def datagram_received(derived, data: bytes, addr: tuple[str, int]) -> None:
                 try:
-                    for server_name, queue in derived.message_queue.items():
-                        if not queue.empty():
-                            queue.join()
-                        queue.put({})
+                    self.handle_datagram(data, addr)
                 except Exception as ex:
                     self.log.exception(ex)
 
-        host = self.node.listen_address
-        port = self.node.listen_port
-        self.udp_server = MyThreadingUDPServer((host, port), RequestHandler)
+            def error_received(derived, exc: Exception) -> None:
+                self.log.warning(f"Error on listener port {port}: {exc}")
+
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        # enable reuse, in case the restart was too fast and the port was still in TIME_WAIT
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((host, port))
+        self.udp_transport, _ = await self.loop.create_datagram_endpoint(DCSProtocol, sock=sock)
+        self.log.debug('  - Listener started on interface {} port {} accepting commands.'.format(host, port))
+
+    def start_threading_udp_server(self, host: str, port: int):
+        class RequestHandler(BaseRequestHandler):
+
+            def handle(derived):
+                # all datagrams are read by one thread, it may wait for space in a full queue (overflow: block), which
+                # stops the reading until the consumer caught up, instead of parking a thread per datagram
+                self.handle_datagram(derived.request[0] if derived.request else None, derived.client_address,
+                                     block=True)
+
+        class MyUDPServer(UDPServer):
+            def __init__(derived, server_address: tuple[str, int], request_handler: Callable[..., BaseRequestHandler]):
+                try:
+                    # enable reuse, in case the restart was too fast and the port was still in TIME_WAIT
+                    MyUDPServer.allow_reuse_address = True
+                    MyUDPServer.max_packet_size = 65504
+                    super().__init__(server_address, request_handler)
+                except Exception as ex:
+                    self.log.exception(ex)
+
+            def shutdown(derived):
+                super().shutdown()
+                self.drain_queues()
+
+        self.udp_server = MyUDPServer((host, port), RequestHandler)
         self.executor.submit(self.udp_server.serve_forever)
         self.log.debug('  - Listener started on interface {} port {} accepting commands.'.format(host, port))
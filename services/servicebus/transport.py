@@ -0,0 +1,293 @@
+from __future__ import annotations
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import psycopg
+import socket
+import struct
+import time
+
+from dataclasses import dataclass, field
+from typing import Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .service import ServiceBus
+
+__all__ = [
+    "NodeTransport"
+]
+
+NONCE_SIZE = 16
+MAC_SIZE = 32
+FRAME_HEADER = struct.Struct('>I')
+MAX_FRAME_SIZE = 64 * 1024 * 1024
+# how long a peer that could not be reached is not tried again
+RETRY_AFTER = 30.0
+# how long the address of a peer is cached
+ADDRESS_TTL = 60.0
+# how long to wait before checking again, if the messages sent through the database have been received
+CATCH_UP_DELAY = 1.0
+
+
+class AuthenticationError(Exception):
+    pass
+
+
+class Session:
+    """
+    An authenticated connection to another node.
+
+    Both sides prove that they know the shared secret on connect (challenge / response with a nonce of each side).
+    Every frame is signed with a session key and a sequence number, so frames can't be replayed or reordered.
+    """
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, key: bytes):
+        self.reader = reader
+        self.writer = writer
+        self.key = key
+        self.send_seq = 0
+        self.recv_seq = 0
+
+    @staticmethod
+    async def connect(host: str, port: int, secret: bytes, timeout: float) -> Session:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+        try:
+            server_nonce = await asyncio.wait_for(reader.readexactly(NONCE_SIZE), timeout)
+            client_nonce = os.urandom(NONCE_SIZE)
+            writer.write(client_nonce + _mac(secret, server_nonce + client_nonce))
+            await writer.drain()
+            proof = await asyncio.wait_for(reader.readexactly(MAC_SIZE), timeout)
+            if not hmac.compare_digest(proof, _mac(secret, client_nonce + server_nonce)):
+                raise AuthenticationError(f"Node on {host}:{port} failed to authenticate")
+            return Session(reader, writer, _mac(secret, server_nonce + client_nonce + b'session'))
+        except Exception:
+            writer.close()
+            raise
+
+    @staticmethod
+    async def accept(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, secret: bytes,
+                     timeout: float) -> Session:
+        server_nonce = os.urandom(NONCE_SIZE)
+        writer.write(server_nonce)
+        await writer.drain()
+        client_nonce = await asyncio.wait_for(reader.readexactly(NONCE_SIZE), timeout)
+        proof = await asyncio.wait_for(reader.readexactly(MAC_SIZE), timeout)
+        if not hmac.compare_digest(proof, _mac(secret, server_nonce + client_nonce)):
+            raise AuthenticationError("Client failed to authenticate")
+        writer.write(_mac(secret, client_nonce + server_nonce))
+        await writer.drain()
+        return Session(reader, writer, _mac(secret, server_nonce + client_nonce + b'session'))
+
+    async def send(self, payload: bytes) -> None:
+        mac = _mac(self.key, struct.pack('>Q', self.send_seq) + payload)
+        self.send_seq += 1
+        self.writer.write(FRAME_HEADER.pack(len(payload)) + mac + payload)
+        await self.writer.drain()
+
+    async def receive(self) -> bytes:
+        size, = FRAME_HEADER.unpack(await self.reader.readexactly(FRAME_HEADER.size))
+        if size > MAX_FRAME_SIZE:
+            raise AuthenticationError(f"Frame too large ({size} bytes)")
+        mac = await self.reader.readexactly(MAC_SIZE)
+        payload = await self.reader.readexactly(size)
+        if not hmac.compare_digest(mac, _mac(self.key, struct.pack('>Q', self.recv_seq) + payload)):
+            raise AuthenticationError("Invalid signature")
+        self.recv_seq += 1
+        return payload
+
+    @property
+    def closed(self) -> bool:
+        return self.writer.is_closing()
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+def _mac(key: bytes, data: bytes) -> bytes:
+    return hmac.new(key, data, hashlib.sha256).digest()
+
+
+@dataclass
+class Peer:
+    name: str
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    session: Optional[Session] = None
+    address: Optional[tuple[str, int]] = None
+    resolved: float = 0
+    retry: float = 0
+    # channels with messages sent through the database, the direct connection is only used again when they are gone
+    fallback: set[str] = field(default_factory=set)
+
+
+class NodeTransport:
+    """
+    Direct TCP connections between the nodes of a cluster, used for the intercom and broadcasts messages instead of
+    the database tables. Every node announces its address in the nodes table.
+    If a node can't be reached, the messages are sent through the database (PubSub) as before. To keep the order,
+    the direct connection is only used again, when the other node has received all messages sent through the database.
+    """
+
+    def __init__(self, bus: ServiceBus, config: dict):
+        self.bus = bus
+        self.node = bus.node
+        self.log = bus.log
+        self.loop = bus.loop
+        self.secret: bytes = config['secret'].encode('utf-8')
+        self.host = self.node.listen_address
+        self.port: int = config.get('port', self.node.listen_port + 1)
+        self.address: str = config.get('address') or (
+            self.host if self.host != '0.0.0.0' else socket.gethostbyname(socket.gethostname())
+        )
+        self.timeout: float = config.get('timeout', 5.0)
+        self.server: Optional[asyncio.Server] = None
+        self.peers: dict[str, Peer] = {}
+        self.sessions: set[Session] = set()
+        # messages that are being sent
+        self.tasks: set[asyncio.Task] = set()
+        # statistics
+        self.sent = 0
+        self.received = 0
+        self.fallbacks = 0
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+        # announce our address to the other nodes
+        async with self.node.apool.connection() as conn:
+            async with conn.transaction():
+                await conn.execute("UPDATE nodes SET transport_address = %s WHERE guild_id = %s AND node = %s",
+                                   (f"{self.address}:{self.port}", self.node.guild_id, self.node.name))
+        self.log.debug(f'  - Node transport listening on {self.host}:{self.port}.')
+
+    async def stop(self):
+        if not self.server:
+            return
+        async with self.node.apool.connection() as conn:
+            async with conn.transaction():
+                await conn.execute("UPDATE nodes SET transport_address = NULL WHERE guild_id = %s AND node = %s",
+                                   (self.node.guild_id, self.node.name))
+        # let the messages in flight go out (or fall back to the database)
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.server.close()
+        for session in list(self.sessions):
+            session.close()
+        for peer in self.peers.values():
+            if peer.session:
+                peer.session.close()
+        await self.server.wait_closed()
+
+    def publish(self, node: str, channel: str, data: dict) -> None:
+        """
+        Sends a message to another node. Can be called from any thread.
+        """
+        payload = json.dumps({"channel": channel, "node": node, "data": data}).encode('utf-8')
+        self.loop.call_soon_threadsafe(self._create_task, node, channel, payload, data)
+
+    def _create_task(self, node: str, channel: str, payload: bytes, data: dict) -> None:
+        task = asyncio.create_task(self._send(node, channel, payload, data))
+        self.tasks.add(task)
+        task.add_done_callback(self._task_done)
+
+    def _task_done(self, task: asyncio.Task) -> None:
+        self.tasks.discard(task)
+        if not task.cancelled() and task.exception():
+            self.log.error(f"Node transport: {task.exception()!r}", exc_info=task.exception())
+
+    async def _send(self, node: str, channel: str, payload: bytes, data: dict) -> None:
+        peer = self.peers.setdefault(node, Peer(name=node))
+        # the lock keeps the order of the messages per node
+        async with peer.lock:
+            if time.monotonic() >= peer.retry and await self._caught_up(peer, channel):
+                try:
+                    session = await self._connect(peer)
+                    if session:
+                        await session.send(payload)
+                        self.sent += 1
+                        return
+                except (OSError, EOFError, asyncio.TimeoutError, AuthenticationError) as ex:
+                    self.log.warning(f"Node {node} can't be reached directly ({ex!r}), using the database.")
+                    if peer.session:
+                        peer.session.close()
+                    peer.session = None
+                    peer.address = None
+                    peer.retry = time.monotonic() + RETRY_AFTER
+            self.fallbacks += 1
+            peer.fallback.add(channel)
+            getattr(self.bus, f"{channel}_channel").publish(node, data)
+
+    async def _caught_up(self, peer: Peer, channel: str) -> bool:
+        """
+        Returns True, if the messages sent through the database on this channel have been received by the peer.
+        """
+        if channel not in peer.fallback:
+            return True
+        try:
+            pending = await getattr(self.bus, f"{channel}_channel").pending(peer.name)
+        except psycopg.OperationalError:
+            pending = True
+        if pending:
+            # don't ask the database for every message
+            peer.retry = time.monotonic() + CATCH_UP_DELAY
+            return False
+        peer.fallback.discard(channel)
+        return True
+
+    async def _connect(self, peer: Peer) -> Optional[Session]:
+        if peer.session and not peer.session.closed:
+            return peer.session
+        if not peer.address or time.monotonic() - peer.resolved > ADDRESS_TTL:
+            peer.address = await self._resolve(peer.name)
+            peer.resolved = time.monotonic()
+        if not peer.address:
+            return None
+        peer.session = await Session.connect(*peer.address, secret=self.secret, timeout=self.timeout)
+        return peer.session
+
+    async def _resolve(self, node: str) -> Optional[tuple[str, int]]:
+        async with self.node.apool.connection() as conn:
+            if node == 'Master':
+                cursor = await conn.execute("""
+                    SELECT n.transport_address FROM nodes n, cluster c
+                    WHERE n.guild_id = c.guild_id AND n.node = c.master AND c.guild_id = %s
+                """, (self.node.guild_id, ))
+            else:
+                cursor = await conn.execute("""
+                    SELECT transport_address FROM nodes WHERE guild_id = %s AND node = %s
+                """, (self.node.guild_id, node))
+            row = await cursor.fetchone()
+        if not row or not row[0]:
+            return None
+        host, port = row[0].rsplit(':', 1)
+        return host, int(port)
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            session = await Session.accept(reader, writer, self.secret, self.timeout)
+        except (OSError, EOFError, asyncio.TimeoutError, AuthenticationError) as ex:
+            self.log.warning(f"Node transport: connection from {writer.get_extra_info('peername')} refused: {ex!r}")
+            writer.close()
+            return
+        self.sessions.add(session)
+        try:
+            while True:
+                message = json.loads(await session.receive())
+                self.received += 1
+                if message['node'] == 'Master' and not self.node.master:
+                    # the sender does not know about a master change yet
+                    getattr(self.bus, f"{message['channel']}_channel").publish('Master', message['data'])
+                elif message['channel'] == 'intercom':
+                    # noinspection PyAsyncCall
+                    asyncio.create_task(self.bus.handle_rpc(message['data']))
+                else:
+                    # noinspection PyAsyncCall
+                    asyncio.create_task(self.bus.handle_broadcast_event(message['data']))
+        except (OSError, EOFError):
+            pass
+        except AuthenticationError as ex:
+            self.log.warning(f"Node transport: {ex}, closing the connection.")
+        except Exception as ex:
+            self.log.exception(ex)
+        finally:
+            self.sessions.discard(session)
+            session.close()
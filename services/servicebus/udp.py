@@ -0,0 +1,106 @@
+from __future__ import annotations
+import asyncio
+import json
+import logging
+import socket
+import threading
+
+from collections import deque
+from typing import TYPE_CHECKING
+
+from . import codec
+
+if TYPE_CHECKING:
+    from core import Server
+    from .service import ServiceBus
+
+__all__ = [
+    "UDPSender"
+]
+
+
+class UDPSender:
+    """
+    One long-lived, non-blocking UDP socket that sends all messages of a node to its DCS servers.
+
+    Messages are put into an outbox and sent by the event loop. Everything that gets queued in the same loop tick
+    is sent in one go. If coalescing is enabled, identical messages to the same server within a tick are only sent
+    once.
+    """
+
+    def __init__(self, bus: ServiceBus, coalesce: bool = False):
+        self.log = bus.log
+        self.loop: asyncio.AbstractEventLoop = bus.loop
+        self.coalesce = coalesce
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.setblocking(False)
+        self.outbox: deque[tuple[bytes, tuple[str, int]]] = deque()
+        self.lock = threading.Lock()
+        self.scheduled = False
+        self.closed = False
+        # statistics
+        self.sent = 0
+        self.coalesced = 0
+        self.errors = 0
+
+    def send(self, server: Server, message: dict) -> None:
+        if self.log.isEnabledFor(logging.DEBUG):
+            self.log.debug(f"HOST->{server.name}: {json.dumps(message)}")
+        payload = codec.encode(message, getattr(server, 'wire_format', codec.WIRE_FORMAT_JSON))
+        self.put(payload, ('127.0.0.1', int(server.port)))
+
+    def put(self, payload: bytes, address: tuple[str, int]) -> None:
+        with self.lock:
+            if self.closed:
+                # shutdown, the socket is gone
+                return
+            self.outbox.append((payload, address))
+            if self.scheduled:
+                return
+            self.scheduled = True
+        try:
+            self.loop.call_soon_threadsafe(self.flush)
+        except RuntimeError:
+            # the loop is already closed (shutdown), send directly
+            self.flush()
+
+    def flush(self) -> None:
+        with self.lock:
+            batch = list(self.outbox)
+            self.outbox.clear()
+            self.scheduled = False
+        if self.coalesce:
+            size = len(batch)
+            batch = list(dict.fromkeys(batch))
+            self.coalesced += size - len(batch)
+        for idx, (payload, address) in enumerate(batch):
+            try:
+                self.socket.sendto(payload, address)
+                self.sent += 1
+            except BlockingIOError:
+                if self.closed:
+                    self.errors += len(batch) - idx
+                    self.log.warning(f"Socket buffer full on shutdown, {len(batch) - idx} messages to DCS dropped.")
+                    return
+                # socket buffer is full, retry the rest a bit later
+                with self.lock:
+                    self.outbox.extendleft(reversed(batch[idx:]))
+                    if self.scheduled:
+                        return
+                    self.scheduled = True
+                try:
+                    # flush() might not run on the loop (see put()), so call_later has to be called from there
+                    self.loop.call_soon_threadsafe(self.loop.call_later, 0.01, self.flush)
+                except RuntimeError:
+                    with self.lock:
+                        self.scheduled = False
+                return
+            except OSError as ex:
+                self.errors += 1
+                self.log.warning(f"Can't send message to DCS on port {address[1]}: {ex}")
+
+    def close(self) -> None:
+        with self.lock:
+            self.closed = True
+        self.flush()
+        self.socket.close()
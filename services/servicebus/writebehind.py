@@ -0,0 +1,82 @@
+from __future__ import annotations
+import asyncio
+import logging
+import psycopg
+
+from contextlib import suppress
+from datetime import datetime, timezone
+from typing import Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from psycopg_pool import AsyncConnectionPool
+
+__all__ = [
+    "PlayerWriter"
+]
+
+
+class PlayerWriter:
+    """
+    Write-behind cache for the frequently changing columns of the players table (name and last_seen).
+
+    Updates are collected in memory, only the latest value per player is kept. They are written in one statement
+    every few seconds, on shutdown and before this node hands over the master role.
+    """
+
+    def __init__(self, log: logging.Logger, apool: AsyncConnectionPool, interval: float = 5.0):
+        self.log = log
+        self.apool = apool
+        self.interval = interval
+        # ucid => (name, last_seen)
+        self.pending: dict[str, tuple[str, datetime]] = {}
+        self.lock = asyncio.Lock()
+        self.task: Optional[asyncio.Task] = None
+        # statistics
+        self.updates = 0
+        self.writes = 0
+
+    def start(self) -> None:
+        self.task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self.task:
+            self.task.cancel()
+            # a flush that was interrupted puts its batch back
+            with suppress(asyncio.CancelledError):
+                await self.task
+            self.task = None
+        await self.flush()
+
+    def update(self, ucid: str, name: str) -> None:
+        self.pending[ucid] = (name, datetime.now(timezone.utc).replace(tzinfo=None))
+        self.updates += 1
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception as ex:
+                self.log.exception(ex)
+
+    async def flush(self) -> None:
+        async with self.lock:
+            if not self.pending:
+                return
+            batch, self.pending = self.pending, {}
+            try:
+                async with self.apool.connection() as conn:
+                    async with conn.transaction():
+                        await conn.execute("""
+                            UPDATE players p SET name = t.name, last_seen = t.last_seen
+                            FROM unnest(%s::text[], %s::text[], %s::timestamp[]) AS t(ucid, name, last_seen)
+                            WHERE p.ucid = t.ucid
+                        """, (list(batch.keys()), [x[0] for x in batch.values()], [x[1] for x in batch.values()]))
+                self.writes += 1
+            except psycopg.OperationalError as ex:
+                self.log.warning(f"Player updates could not be written, retrying: {ex}")
+                # newer updates that came in meanwhile win
+                self.pending = batch | self.pending
+            except asyncio.CancelledError:
+                self.pending = batch | self.pending
+                raise
@@ -0,0 +1,2 @@
+ALTER TABLE nodes ADD COLUMN IF NOT EXISTS transport_address TEXT;
+UPDATE version SET version='v3.11';
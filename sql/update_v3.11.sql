@@ -0,0 +1,6 @@
+ALTER TABLE intercom SET UNLOGGED;
+ALTER TABLE broadcasts SET UNLOGGED;
+ALTER TABLE intercom SET (autovacuum_vacuum_scale_factor = 0, autovacuum_vacuum_threshold = 1000, autovacuum_vacuum_cost_delay = 0, autovacuum_analyze_scale_factor = 0, autovacuum_analyze_threshold = 1000);
+ALTER TABLE broadcasts SET (autovacuum_vacuum_scale_factor = 0, autovacuum_vacuum_threshold = 1000, autovacuum_vacuum_cost_delay = 0, autovacuum_analyze_scale_factor = 0, autovacuum_analyze_threshold = 1000);
+CREATE INDEX IF NOT EXISTS idx_broadcasts_node ON broadcasts (node);
+UPDATE version SET version='v3.12';
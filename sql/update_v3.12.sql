@@ -0,0 +1,5 @@
+ALTER TABLE intercom ADD COLUMN IF NOT EXISTS recipients TEXT[];
+ALTER TABLE broadcasts ADD COLUMN IF NOT EXISTS recipients TEXT[];
+CREATE UNLOGGED TABLE IF NOT EXISTS intercom_acks (id INTEGER NOT NULL REFERENCES intercom (id) ON DELETE CASCADE, node TEXT NOT NULL, PRIMARY KEY (id, node));
+CREATE UNLOGGED TABLE IF NOT EXISTS broadcasts_acks (id INTEGER NOT NULL REFERENCES broadcasts (id) ON DELETE CASCADE, node TEXT NOT NULL, PRIMARY KEY (id, node));
+UPDATE version SET version='v3.13';
@@ -0,0 +1,9 @@
+ALTER TABLE intercom ADD COLUMN IF NOT EXISTS priority SMALLINT NOT NULL DEFAULT 0;
+ALTER TABLE broadcasts ADD COLUMN IF NOT EXISTS priority SMALLINT NOT NULL DEFAULT 0;
+DROP INDEX IF EXISTS idx_intercom_node;
+CREATE INDEX IF NOT EXISTS idx_intercom_node ON intercom (node, priority);
+DROP INDEX IF EXISTS idx_broadcasts_node;
+CREATE INDEX IF NOT EXISTS idx_broadcasts_node ON broadcasts (node, priority);
+CREATE OR REPLACE FUNCTION intercom_notify() RETURNS trigger AS $$ BEGIN PERFORM pg_notify('intercom', NEW.node); PERFORM pg_notify('intercom_lanes', NEW.node || ':' || NEW.priority); RETURN NEW; END; $$ LANGUAGE plpgsql;
+CREATE OR REPLACE FUNCTION broadcasts_notify() RETURNS trigger AS $$ BEGIN PERFORM pg_notify('broadcasts', NEW.node); PERFORM pg_notify('broadcasts_lanes', NEW.node || ':' || NEW.priority); RETURN NEW; END; $$ LANGUAGE plpgsql;
+UPDATE version SET version='v3.14';
@@ -0,0 +1,73 @@
+"""
+Compares the cost of handing an event payload to the listeners of 25 plugins as a deep copy (as before) and as a
+copy-on-write EventData, under a synthetic storm of onMissionEvent events.
+
+Run from the root of the bot:
+    python -m tests.benchmarks.event_payload
+"""
+import time
+import tracemalloc
+
+from copy import deepcopy
+from core.listener import EventData
+
+LISTENERS = 25
+EVENTS = 2000
+
+
+def mission_event(i: int) -> dict:
+    unit = {
+        "name": f"Player {i}",
+        "unit_name": f"Aerial-1-{i}",
+        "unit_type": "F/A-18C_hornet",
+        "category": 1,
+        "coalition": 2,
+        "position": {"x": 1000.0 + i, "y": 2000.0, "z": 3000.0},
+        "ammo": [{"desc": {"typeName": f"weapon_{n}", "category": 1}, "count": n} for n in range(8)]
+    }
+    return {
+        "command": "onMissionEvent",
+        "server_name": "DCS Server",
+        "eventName": "S_EVENT_HIT",
+        "time": 1000.0 + i,
+        "initiator": unit,
+        "target": deepcopy(unit),
+        "weapon": {"name": "AIM_120C", "category": 1},
+        "comment": ""
+    }
+
+
+def listener(data: dict, n: int) -> None:
+    # most listeners only read a few fields, some change the payload for themselves
+    _ = data['eventName'], data.get('initiator', {}).get('name')
+    if n % 5 == 0:
+        data['initiator']['name'] = 'changed'
+
+
+def run(wrap) -> tuple[float, int]:
+    events = [mission_event(i) for i in range(EVENTS)]
+    start = time.process_time()
+    for data in events:
+        for n in range(LISTENERS):
+            listener(wrap(data), n)
+    cpu = time.process_time() - start
+    # the listeners run as tasks in parallel, so all copies of one event are alive at the same time
+    tracemalloc.start()
+    copies = [wrap(events[0]) for _ in range(LISTENERS)]
+    for n, data in enumerate(copies):
+        listener(data, n)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return cpu, size
+
+
+def main():
+    print(f"{EVENTS} events x {LISTENERS} listeners")
+    for name, wrap in [("deepcopy", deepcopy), ("EventData", EventData)]:
+        cpu, size = run(wrap)
+        print(f"{name:>10}: {cpu * 1000:8.1f} ms CPU, {cpu / (EVENTS * LISTENERS) * 1e6:6.2f} us per listener, "
+              f"{size / 1024:6.1f} KB allocated per event")
+
+
+if __name__ == '__main__':
+    main()
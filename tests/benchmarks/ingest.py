@@ -0,0 +1,157 @@
+"""
+Compares the two ingest modes of the ServiceBus on the master:
+- threads: one UDP reader thread, one consumer thread per DCS server that hands its batches over to the event loop
+- asyncio: a datagram endpoint and one consumer task per DCS server, all on the event loop
+
+Every DCS server is played by a thread that sends onMissionEvent datagrams to the listener. The total rate is raised
+step by step, each step reports how many events were dispatched (UDP drops what the listener can't keep up with), the
+throughput and the dispatch latency from the send until the listener sees the event.
+Run from the root of the bot:
+    python -m tests.benchmarks.ingest [SECONDS PER STEP]
+"""
+import asyncio
+import json
+import logging
+import socket
+import sys
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+# the bot parses the command line when it is imported, so take our arguments away first
+ARGS = sys.argv[1:]
+del sys.argv[1:]
+
+from core import Status
+from services.servicebus.fragments import Reassembler
+from services.servicebus.service import ServiceBus
+
+SERVERS = 4
+RATES = [1000, 2000, 5000, 10000, 20000]
+
+
+class Listener:
+    plugin_name = 'benchmark'
+
+    def __init__(self):
+        self.latencies: list[float] = []
+        self.received = 0
+        self.last = 0.0
+
+    async def processEvent(self, command: str, server, data: dict) -> None:
+        now = time.perf_counter()
+        self.latencies.append(now - data['sent'])
+        self.received += 1
+        self.last = now
+
+    def reset(self):
+        self.latencies.clear()
+        self.received = 0
+        self.last = 0.0
+
+
+def create_bus(ingest: str, listener: Listener) -> ServiceBus:
+    # only what the listener, the consumers and the dispatch need
+    bus = object.__new__(ServiceBus)
+    bus.log = logging.getLogger('ServiceBus')
+    bus.loop = asyncio.get_running_loop()
+    bus.locals = {'ingest': ingest}
+    bus.overflow = bus.get_overflow_policy()
+    bus.ingest = ingest
+    bus.node = SimpleNamespace(master=True, listen_address='127.0.0.1', listen_port=0, locals={})
+    bus.servers = {
+        f"DCS Server {i}": SimpleNamespace(name=f"DCS Server {i}", status=Status.RUNNING, is_remote=False,
+                                           listeners={}, last_seen=None)
+        for i in range(SERVERS)
+    }
+    bus.routes = {'onMissionEvent': [listener]}
+    bus.message_queue = {}
+    bus.consumers = set()
+    bus.handler_stats = {}
+    bus.budgets = {}
+    bus.reassembler = Reassembler(bus.log)
+    bus.executor = ThreadPoolExecutor(thread_name_prefix='ServiceBus', max_workers=20)
+    bus.udp_server = None
+    bus.udp_transport = None
+    return bus
+
+
+async def stop_bus(bus: ServiceBus) -> None:
+    # the listener part of ServiceBus.stop()
+    if bus.udp_server:
+        await asyncio.to_thread(bus.udp_server.shutdown)
+        bus.udp_server.server_close()
+    else:
+        bus.udp_transport.close()
+        await asyncio.to_thread(bus.drain_queues)
+        await asyncio.gather(*bus.consumers, return_exceptions=True)
+    bus.executor.shutdown(wait=True)
+
+
+def send(port: int, server_name: str, count: int, rate: float) -> None:
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        start = time.perf_counter()
+        for i in range(count):
+            if rate:
+                delay = start + i / rate - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            sock.sendto(json.dumps({
+                "command": "onMissionEvent", "server_name": server_name, "eventName": "S_EVENT_SHOT",
+                "initiator": {"name": f"Player {i}", "unit_type": "F-16C_50"}, "sent": time.perf_counter()
+            }).encode('utf-8'), ('127.0.0.1', port))
+
+
+async def load(bus: ServiceBus, listener: Listener, port: int, count: int, rate: float) -> float:
+    listener.reset()
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        asyncio.to_thread(send, port, name, count, rate) for name in bus.servers.keys()
+    ])
+    # wait until everything that made it through was dispatched
+    received = -1
+    while received != listener.received:
+        received = listener.received
+        await asyncio.sleep(0.5)
+    return listener.last - start
+
+
+def percentile(values: list[float], p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] * 1000
+
+
+async def run(ingest: str, rate: float, seconds: float) -> dict:
+    listener = Listener()
+    bus = create_bus(ingest, listener)
+    await bus.start_udp_listener()
+    if bus.udp_server:
+        port = bus.udp_server.server_address[1]
+    else:
+        port = bus.udp_transport.get_extra_info('sockname')[1]
+    count = int(rate * seconds / SERVERS)
+    elapsed = await load(bus, listener, port, count, rate / SERVERS)
+    await stop_bus(bus)
+    return {
+        "sent": count * SERVERS,
+        "received": listener.received,
+        "throughput": listener.received / elapsed,
+        "p50": percentile(listener.latencies, 0.5),
+        "p99": percentile(listener.latencies, 0.99)
+    }
+
+
+async def main(seconds: float):
+    print(f"{SERVERS} DCS servers, {seconds:.0f}s per rate")
+    for ingest in ['threads', 'asyncio']:
+        print(f"{ingest}:")
+        for rate in RATES:
+            result = await run(ingest, rate, seconds)
+            print(f"  {rate:>6} events/s: {result['received'] / result['sent'] * 100:5.1f}% dispatched, "
+                  f"{result['throughput']:6.0f} events/s, latency p50 {result['p50']:7.2f} ms, "
+                  f"p99 {result['p99']:7.2f} ms")
+
+
+if __name__ == '__main__':
+    asyncio.run(main(float(ARGS[0]) if ARGS else 5))
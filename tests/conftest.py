@@ -0,0 +1,4 @@
+import sys
+
+# the bot parses the command line when it is imported, it must not see the arguments of pytest
+sys.argv = sys.argv[:1]
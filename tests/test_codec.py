@@ -0,0 +1,168 @@
+import json
+import unittest
+
+from services.servicebus import codec
+
+
+def lua_frame(*entries: str) -> bytes:
+    """
+    Builds a frame the way DCSServerBotMsgPack.encodeFrame() does for a table with the given key/value entries (hex).
+    """
+    return bytes([codec.MARKER, codec.WIRE_VERSION, codec.TYPE_MSGPACK, 0x80 + len(entries)]) + bytes.fromhex(
+        ''.join(entries))
+
+
+@unittest.skipUnless(codec.msgpack, "msgpack is not installed")
+class TestLuaPayloads(unittest.TestCase):
+    # byte sequences as DCSServerBotMsgPack.lua emits them, as there is no Lua interpreter to create them
+
+    def test_header(self):
+        frame = lua_frame(
+            'a7' + b'command'.hex() + 'ae' + b'onMissionEvent'.hex(),
+            'ab' + b'server_name'.hex() + 'aa' + b'DCS Server'.hex()
+        )
+        self.assertEqual({"command": "onMissionEvent", "server_name": "DCS Server"}, codec.decode(frame))
+
+    def test_integers(self):
+        frame = lua_frame(
+            'a4' + b'fix0'.hex() + '05',
+            'a5' + b'uint8'.hex() + 'ccc8',
+            'a6' + b'uint16'.hex() + 'cd012c',
+            'a6' + b'uint32'.hex() + 'ce00011170',
+            'a6' + b'uint64'.hex() + 'cf0000010000000000',
+            'a4' + b'fix1'.hex() + 'fb',
+            'a4' + b'int8'.hex() + 'd0df',
+            'a5' + b'int16'.hex() + 'd1ff38',
+            'a5' + b'int32'.hex() + 'd2fffeee90'
+        )
+        self.assertEqual({
+            "fix0": 5, "uint8": 200, "uint16": 300, "uint32": 70000, "uint64": 2 ** 40,
+            "fix1": -5, "int8": -33, "int16": -200, "int32": -70000
+        }, codec.decode(frame))
+
+    def test_floats(self):
+        data = codec.decode(lua_frame(
+            'a5' + b'float'.hex() + 'cb3ff8000000000000',
+            'a8' + b'negative'.hex() + 'cbbfd0000000000000',
+            # whole numbers are sent as integers
+            'a5' + b'whole'.hex() + '03',
+            # below -2^31, Lua sends integers as double
+            'a5' + b'large'.hex() + 'cbc1f0000000000000'
+        ))
+        self.assertEqual(1.5, data['float'])
+        self.assertEqual(-0.25, data['negative'])
+        self.assertEqual(3, data['whole'])
+        self.assertEqual(-2 ** 32, data['large'])
+        self.assertIsInstance(data['large'], float)
+
+    def test_strings(self):
+        long = 'x' * 40
+        self.assertEqual({"name": "Müller", "long": long, "empty": ""}, codec.decode(lua_frame(
+            'a4' + b'name'.hex() + 'a7' + 'Müller'.encode('utf-8').hex(),
+            'a4' + b'long'.hex() + 'd928' + long.encode('utf-8').hex(),
+            'a5' + b'empty'.hex() + 'a0'
+        )))
+
+    def test_tables(self):
+        self.assertEqual({
+            "players": [{"name": "Player", "side": 2}, {"name": "Other", "side": 1}],
+            # like JSON, an empty table is an array
+            "empty": [],
+            # sparse tables are maps with string keys
+            "sparse": {"1": "a", "3": "c"},
+            "flags": {"blue": True, "red": False, "none": None}
+        }, codec.decode(lua_frame(
+            'a7' + b'players'.hex() + '92' +
+            '82' + 'a4' + b'name'.hex() + 'a6' + b'Player'.hex() + 'a4' + b'side'.hex() + '02' +
+            '82' + 'a4' + b'name'.hex() + 'a5' + b'Other'.hex() + 'a4' + b'side'.hex() + '01',
+            'a5' + b'empty'.hex() + '90',
+            'a6' + b'sparse'.hex() + '82' + 'a131' + 'a161' + 'a133' + 'a163',
+            'a5' + b'flags'.hex() + '83' + 'a4' + b'blue'.hex() + 'c3' + 'a3' + b'red'.hex() + 'c2' +
+            'a4' + b'none'.hex() + 'c0'
+        )))
+
+    def test_array16(self):
+        frame = lua_frame('a4' + b'list'.hex() + 'dc0014' + ''.join(f"{i:02x}" for i in range(20)))
+        self.assertEqual({"list": list(range(20))}, codec.decode(frame))
+
+    def test_map16(self):
+        frame = lua_frame('a3' + b'map'.hex() + 'de0010' + ''.join(
+            'a2' + f"k{i:x}".encode('utf-8').hex() + f"{i:02x}" for i in range(16)))
+        self.assertEqual({"map": {f"k{i:x}": i for i in range(16)}}, codec.decode(frame))
+
+
+class TestCodec(unittest.TestCase):
+
+    def message(self) -> dict:
+        return {
+            "command": "getMissionUpdate",
+            "server_name": "DCS Server",
+            "mission_time": 1234.5,
+            "real_time": -0.25,
+            "players": [{"id": i, "name": f"Player {i}", "ucid": f"{i:032x}", "side": i % 3} for i in range(20)],
+            "weather": {"wind": {"atGround": {"speed": 0, "dir": 270}}, "clouds": {}},
+            "empty": [],
+            "large": 2 ** 40,
+            "negative": -70000,
+            "unicode": "Müller"
+        }
+
+    def test_json(self):
+        payload = codec.encode(self.message())
+        self.assertEqual(self.message(), json.loads(payload))
+        self.assertEqual(self.message(), codec.decode(payload))
+        # the DCS hooks might add a newline
+        self.assertEqual(self.message(), codec.decode(payload + b'\n'))
+
+    @unittest.skipUnless(codec.msgpack, "msgpack is not installed")
+    def test_msgpack(self):
+        payload = codec.encode(self.message(), codec.WIRE_FORMAT_MSGPACK)
+        self.assertEqual(bytes([codec.MARKER, codec.WIRE_VERSION, codec.TYPE_MSGPACK]), payload[:3])
+        self.assertEqual(self.message(), codec.decode(payload))
+        self.assertLess(len(payload), len(codec.encode(self.message())))
+
+    def test_unsupported_version(self):
+        with self.assertRaises(ValueError):
+            codec.decode(bytes([codec.MARKER, codec.WIRE_VERSION + 1, codec.TYPE_MSGPACK, 0x80]))
+        with self.assertRaises(ValueError):
+            codec.decode(bytes([codec.MARKER]))
+
+    def test_unsupported_type(self):
+        with self.assertRaises(ValueError):
+            codec.decode(bytes([codec.MARKER, codec.WIRE_VERSION, 0x7f, 0x80]))
+
+    def test_invalid_json(self):
+        with self.assertRaises(ValueError):
+            codec.decode(b'{"command": ')
+
+    def test_negotiate(self):
+        self.assertEqual(codec.WIRE_FORMAT_JSON, codec.negotiate(None))
+        self.assertEqual(codec.WIRE_FORMAT_JSON, codec.negotiate('cbor', codec.WIRE_VERSION))
+        self.assertEqual(codec.WIRE_FORMAT_JSON, codec.negotiate(codec.WIRE_FORMAT_JSON, codec.WIRE_VERSION + 1))
+        # an older or newer Lua encoder falls back to JSON
+        self.assertEqual(codec.WIRE_FORMAT_JSON, codec.negotiate(codec.WIRE_FORMAT_MSGPACK, codec.WIRE_VERSION + 1))
+        if codec.msgpack:
+            self.assertEqual(codec.WIRE_FORMAT_MSGPACK, codec.negotiate(codec.WIRE_FORMAT_MSGPACK, codec.WIRE_VERSION))
+
+    def test_fragment(self):
+        payload = codec.FRAGMENT_HEADER.pack(codec.MARKER, codec.WIRE_VERSION, codec.TYPE_FRAGMENT, 7, 1, 3) + b'chunk'
+        self.assertTrue(codec.is_fragment(payload))
+        self.assertEqual((7, 1, 3, b'chunk'), codec.parse_fragment(payload))
+        self.assertFalse(codec.is_fragment(codec.encode(self.message())))
+        if codec.msgpack:
+            self.assertFalse(codec.is_fragment(codec.encode(self.message(), codec.WIRE_FORMAT_MSGPACK)))
+
+    def test_invalid_fragment(self):
+        header = codec.FRAGMENT_HEADER
+        for payload in [
+            header.pack(codec.MARKER, codec.WIRE_VERSION, codec.TYPE_FRAGMENT, 7, 3, 3),
+            header.pack(codec.MARKER, codec.WIRE_VERSION, codec.TYPE_FRAGMENT, 7, 0, 0),
+            header.pack(codec.MARKER, codec.WIRE_VERSION + 1, codec.TYPE_FRAGMENT, 7, 0, 1),
+            header.pack(codec.MARKER, codec.WIRE_VERSION, codec.TYPE_FRAGMENT, 7, 0, 1)[:-1]
+        ]:
+            with self.assertRaises(ValueError):
+                codec.parse_fragment(payload)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+import threading
+import time
+import unittest
+
+from queue import Full
+from services.servicebus.eventqueue import EventQueue, OverflowPolicy
+
+
+def hit(i: int) -> dict:
+    return {"command": "onMissionEvent", "eventName": "S_EVENT_HIT", "i": i}
+
+
+class TestEventQueue(unittest.TestCase):
+
+    def drain(self, queue: EventQueue) -> list[dict]:
+        events = []
+        while not queue.empty():
+            events.append(queue.get_nowait())
+        return events
+
+    def test_latest_wins(self):
+        queue = EventQueue()
+        queue.put({"command": "getMissionUpdate", "i": 1})
+        queue.put({"command": "onPlayerConnect"})
+        queue.put({"command": "getMissionUpdate", "i": 2})
+        self.assertEqual([{"command": "onPlayerConnect"}, {"command": "getMissionUpdate", "i": 2}], self.drain(queue))
+        self.assertEqual(1, queue.stats()['coalesced'])
+
+    def test_server_load_is_not_coalesced(self):
+        # the I/O values of serverLoad are deltas, every sample counts
+        queue = EventQueue()
+        for i in range(3):
+            queue.put({"command": "serverLoad", "read_bytes": i})
+        self.assertEqual([0, 1, 2], [x['read_bytes'] for x in self.drain(queue)])
+
+    def test_unlimited(self):
+        queue = EventQueue()
+        for i in range(1000):
+            queue.put(hit(i))
+        self.assertEqual(1000, queue.qsize())
+        self.assertFalse(queue.full())
+
+    def test_drop_oldest(self):
+        # a full queue makes room by dropping the oldest low-priority event
+        queue = EventQueue(maxsize=3, policy=OverflowPolicy.DROP)
+        for i in range(5):
+            queue.put(hit(i))
+        self.assertTrue(queue.full())
+        self.assertEqual([2, 3, 4], [x['i'] for x in self.drain(queue)])
+        self.assertEqual(2, queue.stats()['dropped'])
+
+    def test_drop_newest(self):
+        # nothing that can be dropped is queued, so the new low-priority event is rejected
+        queue = EventQueue(maxsize=2, policy=OverflowPolicy.DROP)
+        queue.put({"command": "onPlayerConnect", "id": 1})
+        queue.put({"command": "onPlayerConnect", "id": 2})
+        queue.put(hit(0))
+        self.assertEqual([1, 2], [x['id'] for x in self.drain(queue)])
+        self.assertEqual(1, queue.stats()['dropped'])
+
+    def test_important_events_exceed_maxsize(self):
+        queue = EventQueue(maxsize=2, policy=OverflowPolicy.DROP)
+        for i in range(3):
+            queue.put({"command": "onPlayerConnect", "id": i})
+        self.assertEqual(3, queue.qsize())
+        self.assertEqual(0, queue.stats()['dropped'])
+
+    def test_coalesce(self):
+        queue = EventQueue(maxsize=2, policy=OverflowPolicy.COALESCE, latest_wins={})
+        queue.put({"command": "perfmon", "i": 1})
+        queue.put({"command": "onPlayerConnect"})
+        queue.put({"command": "perfmon", "i": 2})
+        self.assertEqual([{"command": "onPlayerConnect"}, {"command": "perfmon", "i": 2}], self.drain(queue))
+        stats = queue.stats()
+        self.assertEqual(1, stats['coalesced'])
+        self.assertEqual(0, stats['dropped'])
+
+    def test_block(self):
+        queue = EventQueue(maxsize=1, policy=OverflowPolicy.BLOCK)
+        queue.put(hit(0))
+        threading.Timer(0.1, queue.get).start()
+        start = time.monotonic()
+        queue.put(hit(1))
+        self.assertGreaterEqual(time.monotonic() - start, 0.05)
+        self.assertEqual([1], [x['i'] for x in self.drain(queue)])
+
+    def test_block_timeout(self):
+        queue = EventQueue(maxsize=1, policy=OverflowPolicy.BLOCK)
+        queue.put(hit(0))
+        with self.assertRaises(Full):
+            queue.put(hit(1), timeout=0.05)
+        with self.assertRaises(Full):
+            queue.put_nowait(hit(2))
+        self.assertEqual([0], [x['i'] for x in self.drain(queue)])
+        self.assertEqual(2, queue.stats()['dropped'])
+
+    def test_stats(self):
+        queue = EventQueue(maxsize=2, policy=OverflowPolicy.DROP)
+        for i in range(3):
+            queue.put(hit(i))
+        time.sleep(0.05)
+        queue.get()
+        stats = queue.stats()
+        self.assertEqual(1, stats['qsize'])
+        self.assertEqual(3, stats['enqueued'])
+        self.assertEqual(1, stats['dropped'])
+        self.assertGreaterEqual(stats['latency_avg_ms'], 50)
+        self.assertGreaterEqual(stats['latency_max_ms'], 50)
+        # the counters are reset on every call
+        stats = queue.stats()
+        self.assertEqual(1, stats['qsize'])
+        self.assertEqual(0, stats['enqueued'])
+        self.assertEqual(0, stats['dropped'])
+        self.assertEqual(0, stats['latency_max_ms'])
+
+    def test_join(self):
+        queue = EventQueue(maxsize=2, policy=OverflowPolicy.DROP)
+        for i in range(3):
+            queue.put(hit(i))
+
+        def consume():
+            while True:
+                queue.get()
+                queue.task_done()
+
+        threading.Thread(target=consume, daemon=True).start()
+        # the dropped event must not keep join() waiting
+        queue.join()
+        self.assertEqual(0, queue.qsize())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import logging
+import random
+import time
+import unittest
+
+from services.servicebus import codec
+from services.servicebus.fragments import Reassembler
+
+
+def fragments(message: dict, msg_id: int, chunk_size: int = codec.MAX_CHUNK_SIZE,
+              wire_format: str = codec.WIRE_FORMAT_JSON) -> list[bytes]:
+    """
+    Splits a message like the DCS hooks do (see DCSServerBotMsgPack.lua).
+    """
+    payload = codec.encode(message, wire_format)
+    chunks = [payload[i:i + chunk_size] for i in range(0, len(payload), chunk_size)]
+    return [
+        codec.FRAGMENT_HEADER.pack(codec.MARKER, codec.WIRE_VERSION, codec.TYPE_FRAGMENT, msg_id, idx, len(chunks)) +
+        chunk for idx, chunk in enumerate(chunks)
+    ]
+
+
+def large_message(players: int = 2000) -> dict:
+    return {
+        "command": "getMissionUpdate",
+        "server_name": "DCS Server",
+        "players": [{"name": f"Player {i}", "ucid": f"{i:032x}", "side": i % 3} for i in range(players)]
+    }
+
+
+class TestReassembler(unittest.TestCase):
+
+    def setUp(self):
+        self.log = logging.getLogger(__name__)
+        self.random = random.Random(42)
+
+    def test_in_order(self):
+        reassembler = Reassembler(self.log)
+        message = large_message()
+        parts = fragments(message, 1)
+        self.assertGreater(len(parts), 1)
+        results = [reassembler.add('server', x) for x in parts]
+        self.assertEqual([None] * (len(parts) - 1), results[:-1])
+        self.assertEqual(message, codec.decode(results[-1]))
+        self.assertEqual(0, reassembler.buffered)
+
+    def test_reordered_and_duplicated(self):
+        reassembler = Reassembler(self.log)
+        message = large_message()
+        parts = fragments(message, 1, chunk_size=1000)
+        parts += self.random.sample(parts, 10)
+        self.random.shuffle(parts)
+        results = [x for x in (reassembler.add('server', x) for x in parts) if x]
+        self.assertEqual(1, len(results))
+        self.assertEqual(message, codec.decode(results[0]))
+        self.assertEqual(1, reassembler.completed)
+
+    def test_interleaved_senders(self):
+        reassembler = Reassembler(self.log)
+        messages = {sender: large_message(1000 + i) for i, sender in enumerate(['server1', 'server2', 'server3'])}
+        parts = [(sender, x) for sender, message in messages.items() for x in fragments(message, 7, chunk_size=1000)]
+        self.random.shuffle(parts)
+        results = {}
+        for sender, part in parts:
+            payload = reassembler.add(sender, part)
+            if payload:
+                results[sender] = codec.decode(payload)
+        self.assertEqual(messages, results)
+
+    def test_dropped_fragment_expires(self):
+        reassembler = Reassembler(self.log, timeout=0.1)
+        parts = fragments(large_message(), 1, chunk_size=1000)
+        del parts[self.random.randrange(len(parts))]
+        self.assertFalse(any(reassembler.add('server', x) for x in parts))
+        self.assertEqual(1, len(reassembler.pending))
+        time.sleep(0.2)
+        # the next message triggers the cleanup
+        message = {"command": "test", "data": "x" * 3000}
+        results = [reassembler.add('server', x) for x in fragments(message, 2, chunk_size=1000)]
+        self.assertEqual(message, codec.decode(results[-1]))
+        self.assertEqual(1, reassembler.expired)
+        self.assertEqual(0, reassembler.buffered)
+
+    def test_max_messages(self):
+        reassembler = Reassembler(self.log, max_messages=2)
+        for msg_id in range(3):
+            # only the first fragment of each message arrives
+            reassembler.add('server', fragments(large_message(), msg_id, chunk_size=1000)[0])
+        self.assertEqual([('server', 1), ('server', 2)], list(reassembler.pending.keys()))
+        self.assertEqual(1, reassembler.dropped)
+
+    def test_max_total(self):
+        reassembler = Reassembler(self.log, max_total=5 * codec.MAX_CHUNK_SIZE)
+        for msg_id in range(3):
+            # the first two of three fragments of each message arrive
+            for part in fragments({"data": "x" * (3 * codec.MAX_CHUNK_SIZE - 20)}, msg_id)[:2]:
+                reassembler.add('server', part)
+        self.assertEqual([('server', 1), ('server', 2)], list(reassembler.pending.keys()))
+        self.assertEqual(4 * codec.MAX_CHUNK_SIZE, reassembler.buffered)
+        self.assertEqual(1, reassembler.dropped)
+
+    def test_max_size(self):
+        reassembler = Reassembler(self.log, max_size=codec.MAX_CHUNK_SIZE)
+        with self.assertRaises(ValueError):
+            reassembler.add('server', fragments(large_message(), 1, chunk_size=1000)[0])
+        self.assertEqual(0, len(reassembler.pending))
+
+
+if __name__ == '__main__':
+    unittest.main()
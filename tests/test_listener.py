@@ -0,0 +1,70 @@
+import unittest
+
+from core.listener import EventData
+
+
+def payload() -> dict:
+    return {
+        "eventName": "S_EVENT_HIT",
+        "initiator": {"name": "Player", "ammo": [{"count": 1}, {"count": 2}]},
+        "players": [[1], [2]]
+    }
+
+
+class TestEventData(unittest.TestCase):
+
+    def assertUnchanged(self, data: dict):
+        self.assertEqual(payload(), data)
+
+    def test_getitem(self):
+        data = payload()
+        EventData(data)['initiator']['ammo'][0]['count'] = 0
+        self.assertUnchanged(data)
+
+    def test_items_and_values(self):
+        data = payload()
+        for key, value in EventData(data).items():
+            if key == 'initiator':
+                value['name'] = 'changed'
+        for value in EventData(data).values():
+            if isinstance(value, list):
+                value.append('changed')
+        self.assertUnchanged(data)
+
+    def test_copies(self):
+        data = payload()
+        event = EventData(data)
+        event.copy()['initiator']['name'] = 'changed'
+        {**event}['initiator']['ammo'].pop()
+        dict(event)['players'][0].append(3)
+        (event | {})['initiator']['name'] = 'changed'
+        event.setdefault('initiator')['name'] = 'changed'
+        self.assertUnchanged(data)
+
+    def test_copy_of_changed_view(self):
+        event = EventData(payload())
+        event['initiator']['name'] = 'changed'
+        copy = event.copy()
+        copy['initiator']['name'] = 'copy'
+        self.assertEqual('changed', event['initiator']['name'])
+
+    def test_lists(self):
+        data = payload()
+        players = EventData(data)['players']
+        for player in players:
+            player.append(0)
+        players.copy()[0].append(0)
+        list(reversed(players))[0].append(0)
+        (players + [])[1].append(0)
+        players.pop().append(0)
+        self.assertUnchanged(data)
+
+    def test_listeners_are_isolated(self):
+        data = payload()
+        first, second = EventData(data), EventData(data)
+        first['initiator']['name'] = 'changed'
+        self.assertEqual('Player', second['initiator']['name'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,177 @@
+import asyncio
+import logging
+import random
+import unittest
+
+from concurrent.futures import ThreadPoolExecutor
+from core import Status
+from types import SimpleNamespace
+from unittest.mock import patch, PropertyMock
+from services.servicebus import codec
+from services.servicebus.eventqueue import OverflowPolicy
+from services.servicebus.fragments import Reassembler
+from services.servicebus.service import ServiceBus
+from tests.test_fragments import fragments, large_message
+
+
+def create_bus(**config) -> ServiceBus:
+    # only what the tested methods need
+    bus = object.__new__(ServiceBus)
+    bus.log = logging.getLogger(__name__)
+    bus.locals = config
+    return bus
+
+
+class TestOverflowPolicy(unittest.TestCase):
+
+    def test_default(self):
+        self.assertEqual(OverflowPolicy.DROP, create_bus().get_overflow_policy())
+
+    def test_configured(self):
+        self.assertEqual(OverflowPolicy.COALESCE, create_bus(overflow='coalesce').get_overflow_policy())
+
+    def test_invalid(self):
+        with self.assertLogs(__name__, level=logging.WARNING):
+            self.assertEqual(OverflowPolicy.DROP, create_bus(overflow='dorp').get_overflow_policy())
+
+
+class StuckListener:
+    plugin_name = 'stuck'
+
+    def __init__(self):
+        self.cancelled = 0
+
+    async def processEvent(self, command: str, server, data: dict) -> None:
+        # ignores the first cancellation, like a plugin that catches everything, the second one ends the test
+        while True:
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                self.cancelled += 1
+                if self.cancelled > 1:
+                    raise
+
+
+class TestDispatch(unittest.IsolatedAsyncioTestCase):
+
+    async def test_stuck_listener(self):
+        listener = StuckListener()
+        bus = create_bus()
+        bus.loop = asyncio.get_running_loop()
+        bus.node = SimpleNamespace(locals={})
+        bus.routes = {'onMissionEvent': [listener]}
+        bus.handler_stats = {}
+        bus.budgets = {}
+        server = SimpleNamespace(name='DCS Server', status=Status.RUNNING, is_remote=False)
+        with patch.object(type(bus), 'event_timeout', new_callable=PropertyMock, return_value=0.1):
+            with self.assertLogs(__name__, level=logging.WARNING) as logs:
+                # the consumer thread gives up on the batch and can go on
+                self.assertTrue(await asyncio.to_thread(bus.wait_for_dispatch, server, [{"command": "onMissionEvent"}]))
+        self.assertIn('not processed within', logs.output[-1])
+        # the listener ignored its timeout
+        self.assertEqual(1, listener.cancelled)
+
+
+class Listener:
+    plugin_name = 'test'
+
+    def __init__(self):
+        self.events: list[tuple[str, str, dict]] = []
+
+    async def processEvent(self, command: str, server, data: dict) -> None:
+        self.events.append((command, server.name, dict(data)))
+
+
+class TestHandleDatagram(unittest.IsolatedAsyncioTestCase):
+    # datagrams as they come from the DCS hooks, through handle_datagram(), the queues and consumers to a listener
+
+    async def asyncSetUp(self):
+        self.random = random.Random(42)
+        self.listener = Listener()
+
+    def create_bus(self, ingest: str) -> ServiceBus:
+        bus = create_bus(ingest=ingest)
+        bus.loop = asyncio.get_running_loop()
+        bus.overflow = bus.get_overflow_policy()
+        bus.ingest = ingest
+        bus.node = SimpleNamespace(master=True, listen_port=0, locals={})
+        bus.servers = {
+            name: SimpleNamespace(name=name, status=Status.RUNNING, is_remote=False, listeners={}, last_seen=None)
+            for name in ['DCS Server 1', 'DCS Server 2']
+        }
+        bus.routes = {'getMissionUpdate': [self.listener], 'onMissionEvent': [self.listener]}
+        bus.message_queue = {}
+        bus.consumers = set()
+        bus.handler_stats = {}
+        bus.budgets = {}
+        bus.reassembler = Reassembler(bus.log)
+        bus.executor = ThreadPoolExecutor(thread_name_prefix='ServiceBus', max_workers=4)
+        return bus
+
+    async def receive(self, bus: ServiceBus, datagrams: list[tuple[bytes, tuple[str, int]]]) -> None:
+        if bus.ingest == 'asyncio':
+            # the datagram endpoint calls us on the event loop
+            for payload, address in datagrams:
+                bus.handle_datagram(payload, address)
+        else:
+            # the reader thread of the UDP server
+            await asyncio.to_thread(lambda: [bus.handle_datagram(x, y, block=True) for x, y in datagrams])
+        # the listener part of ServiceBus.stop()
+        await asyncio.to_thread(bus.drain_queues)
+        await asyncio.gather(*bus.consumers, return_exceptions=True)
+        await asyncio.to_thread(bus.executor.shutdown, wait=True)
+        self.assertEqual({}, bus.message_queue)
+
+    async def check(self, wire_format: str):
+        messages = {
+            server_name: [
+                {"command": "onMissionEvent", "server_name": server_name, "eventName": "S_EVENT_SHOT",
+                 "time": 1234.5, "initiator": {"name": "Player", "ammo": []}},
+                large_message(1000 + i) | {"server_name": server_name},
+                {"command": "onMissionEvent", "server_name": server_name, "eventName": "S_EVENT_HIT"}
+            ] for i, server_name in enumerate(['DCS Server 1', 'DCS Server 2'])
+        }
+        senders = []
+        for i, (server_name, events) in enumerate(messages.items()):
+            address = ('127.0.0.1', 6666 + i)
+            # the fragments of the large message arrive reordered
+            parts = fragments(events[1], 1, chunk_size=1000, wire_format=wire_format)
+            self.random.shuffle(parts)
+            parts = [codec.encode(events[0], wire_format)] + parts + [codec.encode(events[2], wire_format)]
+            senders.append([(x, address) for x in parts])
+        # both servers send at the same time
+        datagrams = []
+        while any(senders):
+            datagrams.append(self.random.choice([x for x in senders if x]).pop(0))
+        for ingest in ['asyncio', 'threads']:
+            with self.subTest(ingest=ingest):
+                self.listener.events.clear()
+                bus = self.create_bus(ingest)
+                await self.receive(bus, datagrams)
+                for server_name, events in messages.items():
+                    self.assertEqual([(x['command'], server_name, x) for x in events],
+                                     [x for x in self.listener.events if x[1] == server_name])
+                self.assertEqual(0, bus.reassembler.buffered)
+                self.assertTrue(all(x.last_seen for x in bus.servers.values()))
+
+    async def test_json(self):
+        await self.check(codec.WIRE_FORMAT_JSON)
+
+    @unittest.skipUnless(codec.msgpack, "msgpack is not installed")
+    async def test_msgpack(self):
+        await self.check(codec.WIRE_FORMAT_MSGPACK)
+
+    async def test_invalid(self):
+        bus = self.create_bus('asyncio')
+        with self.assertLogs(__name__, level=logging.WARNING) as logs:
+            bus.handle_datagram(b'', ('127.0.0.1', 6666))
+            bus.handle_datagram(bytes([codec.MARKER, codec.WIRE_VERSION + 1, codec.TYPE_MSGPACK, 0x80]),
+                                ('127.0.0.1', 6666))
+            bus.handle_datagram(codec.encode({"command": "onMissionEvent"}), ('127.0.0.1', 6666))
+        self.assertEqual(3, len(logs.output))
+        self.assertEqual({}, bus.message_queue)
+        bus.executor.shutdown()
+
+
+if __name__ == '__main__':
+    unittest.main()
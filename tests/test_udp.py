@@ -0,0 +1,66 @@
+import asyncio
+import json
+import logging
+import socket
+import unittest
+
+from types import SimpleNamespace
+
+from services.servicebus.udp import UDPSender
+
+
+class TestUDPSender(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        # local UDP sink that plays the DCS server
+        self.sink = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sink.bind(('127.0.0.1', 0))
+        self.sink.settimeout(1.0)
+        self.server = SimpleNamespace(name='DCS Server', port=self.sink.getsockname()[1])
+        self.bus = SimpleNamespace(log=logging.getLogger(__name__), loop=asyncio.get_running_loop())
+
+    async def asyncTearDown(self):
+        self.sink.close()
+
+    def receive(self, count: int) -> list[dict]:
+        return [json.loads(self.sink.recv(65535)) for _ in range(count)]
+
+    async def test_send(self):
+        sender = UDPSender(self.bus)
+        for i in range(100):
+            sender.send(self.server, {"command": "test", "i": i})
+        await asyncio.sleep(0.01)
+        self.assertEqual([{"command": "test", "i": i} for i in range(100)], self.receive(100))
+        self.assertEqual(100, sender.sent)
+        sender.close()
+
+    async def test_send_from_thread(self):
+        sender = UDPSender(self.bus)
+        await asyncio.to_thread(sender.send, self.server, {"command": "test"})
+        await asyncio.sleep(0.01)
+        self.assertEqual([{"command": "test"}], self.receive(1))
+        sender.close()
+
+    async def test_coalesce(self):
+        sender = UDPSender(self.bus, coalesce=True)
+        for _ in range(10):
+            sender.send(self.server, {"command": "sendChatMessage", "message": "Hello"})
+        sender.send(self.server, {"command": "sendChatMessage", "message": "World"})
+        await asyncio.sleep(0.01)
+        self.assertEqual(["Hello", "World"], [x['message'] for x in self.receive(2)])
+        self.assertEqual(9, sender.coalesced)
+        sender.close()
+
+    async def test_send_after_close(self):
+        sender = UDPSender(self.bus)
+        sender.send(self.server, {"command": "first"})
+        sender.close()
+        sender.send(self.server, {"command": "second"})
+        await asyncio.sleep(0.01)
+        self.assertEqual([{"command": "first"}], self.receive(1))
+        self.assertEqual(0, len(sender.outbox))
+        self.assertFalse(sender.scheduled)
+
+
+if __name__ == '__main__':
+    unittest.main()